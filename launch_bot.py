@@ -1,21 +1,20 @@
 import discord
 import os
 import random
+import traceback
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import SystemMessage, AIMessage, ToolMessage, HumanMessage
-from langgraph.prebuilt.chat_agent_executor import AgentState
-from langgraph.prebuilt import InjectedState
-from typing_extensions import Annotated
-from langchain_core.tools import tool
-from langgraph.prebuilt import ToolNode, create_react_agent
 from datetime import datetime, timedelta
-from langchain_tavily import TavilySearch
+from functools import lru_cache
 from discord.utils import sleep_until, utcnow
 from dotenv import load_dotenv
 from discord import app_commands, Poll, PollMedia, Emoji
 from discord.ext import commands, tasks
 
+from discord.errors import HTTPException
+
+from src.command_sync import sync_command_tree
+from src.metrics import outbound_timer, record_command, start_metrics_export
+
 
 # https://discord.com/developers/applications/1319294811471085662/information
 
@@ -45,8 +44,33 @@ discord_token = os.getenv("DISCORD_TOKEN")
 google_API_TOKEN = os.getenv("GOOGLE_API_KEY")
 tavily_API_KEY = os.getenv("TAVILY_API_KEY")
 
-bot = commands.Bot(command_prefix="/", intents=discord.Intents.all())
-llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash")
+class LaunchBot(commands.Bot):
+    async def setup_hook(self):
+        """
+        Sync the commands before connecting to Discord.
+        Runs once per process, unlike on_ready which fires again after each reconnect.
+        """
+        # Prometheus endpoint and periodic summary log, if configured
+        await start_metrics_export()
+
+        try:
+            # Only sent when the command tree changed since the last sync, see src/command_sync.py
+            await sync_command_tree(self.tree)
+        except HTTPException as e:
+            print(f"Command sync failed: {e}")
+
+
+bot = LaunchBot(command_prefix="/", intents=discord.Intents.all())
+
+
+# LangChain, LangGraph and the Gemini / Tavily clients are slow to import and only
+# used by two commands: they are loaded on the first call of one of them
+@lru_cache(maxsize=1)
+def get_llm():
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI(model="gemini-2.0-flash")
+
 
 # Instantiation The tool accepts various parameters during instantiation:
 
@@ -62,18 +86,22 @@ llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash")
 # exclude_domains (optional, List[str]): List of domains to specifically exclude. Default is None.
 
 # Tavily search tool is used for text-based search on the web for the movie night
-tavily_search_tool = TavilySearch(
-    max_results=5,
-    topic="general",
-    # include_answer=False,
-    # include_raw_content=False,
-    include_images=False,
-    # include_image_descriptions=False,
-    # search_depth="basic",
-    # time_range="day",
-    # include_domains=None,
-    # exclude_domains=None
-)
+@lru_cache(maxsize=1)
+def get_tavily_search_tool():
+    from langchain_tavily import TavilySearch
+
+    return TavilySearch(
+        max_results=5,
+        topic="general",
+        # include_answer=False,
+        # include_raw_content=False,
+        include_images=False,
+        # include_image_descriptions=False,
+        # search_depth="basic",
+        # time_range="day",
+        # include_domains=None,
+        # exclude_domains=None
+    )
 
 
 @bot.event
@@ -83,16 +111,23 @@ async def on_ready():
     """
     print(f"Logged on as {bot.user}!")
 
-    try:
-        synced = await bot.tree.sync()
-        print(f"Synced {len(synced)} command(s)")
-    except Exception as e:
-        print(e)
-
     # goes with tasks
     # slow_count.start()
 
 
+# Latency and errors of every app command, see src/metrics.py
+@bot.event
+async def on_app_command_completion(interaction: discord.Interaction, command: app_commands.Command):
+    record_command(interaction)
+
+
+@bot.tree.error
+async def on_app_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    record_command(interaction, error)
+    print(f"Command {interaction.command.name if interaction.command else 'unknown'} failed: {error}")
+    traceback.print_exception(error)
+
+
 # @tasks.loop(seconds=5.0, count=5)
 # async def slow_count():
 #     print(slow_count.current_loop)
@@ -292,6 +327,8 @@ async def poll_decision(
 async def interract_with_chatbot(
     interaction: discord.Interaction, human_query: str, show_message: bool = True
 ):
+    from langchain_core.messages import SystemMessage, AIMessage, HumanMessage
+
     # Split roles mentions into a list of role strings
     # role_id_list = [1311644566109028432]
     role_id_list = [1311644566109028432]
@@ -346,7 +383,8 @@ async def interract_with_chatbot(
         "Une erreur est survenue en appelant l'API qui me permet de parler ! J'en suis désolé :("
     )
     try:
-        chatbot_response = await llm.ainvoke(query)
+        with outbound_timer("gemini", "chat"):
+            chatbot_response = await get_llm().ainvoke(query)
     except Exception as e:
         print(f"An Error occured when calling the chatbot:{e}")
 
@@ -355,73 +393,6 @@ async def interract_with_chatbot(
     )
 
 
-@tool
-async def publish_poll(
-    question: str,
-    answers: str,
-    state: Annotated[dict, InjectedState],
-    duration: int = 48,
-    answers_emoji: str = None,
-    multiple: bool = True,
-):
-    """
-    Commande pour créer un sondage avec réactions.
-    """
-    # print(f"{question = }, {answers.split('|') = }, {duration = }")
-    interaction: discord.Interaction = state["interaction"]
-    answers = answers.split("|")
-    answers_emoji = (
-        answers_emoji.split()
-        if answers_emoji is not None
-        else [f"number_{idx}" for idx in range(len(answers))]
-    )
-    if len(answers) < 2:
-        await publish_discord_message(
-            "Merci d'ajouter au moins deux choix pour le sondage !",
-            interaction,
-            show_message=True,
-        )
-        return None
-
-    poll = Poll(question, timedelta(hours=duration), multiple=multiple)
-
-    # for answer, emoji in zip(answers, answers_emoji):
-    #     print(f'Answers :{answer},{emoji}')
-    #     poll.add_answer(text=answer, emoji=emoji)
-
-    for answer in answers:
-        poll.add_answer(text=answer)
-
-    await interaction.response.send_message(poll=poll)
-    return True
-
-
-class State(AgentState):
-    interaction: discord.Interaction
-
-
-@tool
-async def publish_discord_message_tool(
-    message: str, state: Annotated[dict, InjectedState], show_message: bool = True
-):
-    """
-    Envoie un message sur Discord via une interaction.
-
-    Cette fonction envoie un message en réponse à une interaction Discord. Si la réponse a
-    déjà été envoyée, elle utilise `followup.send()`, sinon elle utilise `response.send_message()`.
-
-    :param message: Le message à envoyer sur Discord.
-    :param state: Un dictionnaire contenant l'état de l'interaction Discord, incluant l'objet `interaction`.
-    :param show_message: Détermine si le message est visible pour tous (`True`) ou seulement pour l'utilisateur (`False`).
-
-    :raises KeyError: Si l'interaction n'est pas trouvée dans l'état fourni.
-    """
-    interaction: discord.Interaction = state["interaction"]
-
-    await publish_discord_message(message, interaction, show_message)
-    return True
-
-
 async def publish_discord_message(
     message: str, interaction: discord.Interaction, show_message: bool = True
 ):
@@ -438,11 +409,91 @@ async def publish_discord_message(
     :raises KeyError: Si l'interaction n'est pas trouvée dans l'état fourni.
     """
     if interaction.response.is_done():
-        await interaction.followup.send(message, ephemeral=not show_message)
+        with outbound_timer("discord", "followup"):
+            await interaction.followup.send(message, ephemeral=not show_message)
     else:
         await interaction.response.send_message(message, ephemeral=not show_message)
 
 
+@lru_cache(maxsize=1)
+def get_movie_night_agent():
+    """
+    Build the movie night agent and its tools, importing LangChain / LangGraph on first use.
+    """
+    from typing_extensions import Annotated
+    from langchain_core.tools import tool
+    from langgraph.prebuilt import InjectedState, ToolNode, create_react_agent
+    from langgraph.prebuilt.chat_agent_executor import AgentState
+
+    @tool
+    async def publish_poll(
+        question: str,
+        answers: str,
+        state: Annotated[dict, InjectedState],
+        duration: int = 48,
+        answers_emoji: str = None,
+        multiple: bool = True,
+    ):
+        """
+        Commande pour créer un sondage avec réactions.
+        """
+        # print(f"{question = }, {answers.split('|') = }, {duration = }")
+        interaction: discord.Interaction = state["interaction"]
+        answers = answers.split("|")
+        answers_emoji = (
+            answers_emoji.split()
+            if answers_emoji is not None
+            else [f"number_{idx}" for idx in range(len(answers))]
+        )
+        if len(answers) < 2:
+            await publish_discord_message(
+                "Merci d'ajouter au moins deux choix pour le sondage !",
+                interaction,
+                show_message=True,
+            )
+            return None
+
+        poll = Poll(question, timedelta(hours=duration), multiple=multiple)
+
+        # for answer, emoji in zip(answers, answers_emoji):
+        #     print(f'Answers :{answer},{emoji}')
+        #     poll.add_answer(text=answer, emoji=emoji)
+
+        for answer in answers:
+            poll.add_answer(text=answer)
+
+        await interaction.response.send_message(poll=poll)
+        return True
+
+    class State(AgentState):
+        interaction: discord.Interaction
+
+    @tool
+    async def publish_discord_message_tool(
+        message: str, state: Annotated[dict, InjectedState], show_message: bool = True
+    ):
+        """
+        Envoie un message sur Discord via une interaction.
+
+        Cette fonction envoie un message en réponse à une interaction Discord. Si la réponse a
+        déjà été envoyée, elle utilise `followup.send()`, sinon elle utilise `response.send_message()`.
+
+        :param message: Le message à envoyer sur Discord.
+        :param state: Un dictionnaire contenant l'état de l'interaction Discord, incluant l'objet `interaction`.
+        :param show_message: Détermine si le message est visible pour tous (`True`) ou seulement pour l'utilisateur (`False`).
+
+        :raises KeyError: Si l'interaction n'est pas trouvée dans l'état fourni.
+        """
+        interaction: discord.Interaction = state["interaction"]
+
+        await publish_discord_message(message, interaction, show_message)
+        return True
+
+    tools = [publish_poll, publish_discord_message_tool, get_tavily_search_tool()]
+    tool_node = ToolNode(tools)
+    return create_react_agent(get_llm(), tools=tool_node, state_schema=State)
+
+
 @bot.tree.command(name="movie_night")
 @app_commands.describe(movies_list="la liste des films a proposer")
 async def create_poll(
@@ -464,20 +515,20 @@ async def create_poll(
     watchparty ! La soirée film aura lieu {discord_timestamps(prochain_mercredi())} ({discord_timestamps(prochain_mercredi(), format='R')}).'
     Ne publie ce message qu’après avoir posté les synopsis. Suis cet ordre strictement et n’invente pas de date ou d’informations supplémentaires."""
 
-    tools = [publish_poll, publish_discord_message_tool, tavily_search_tool]
-    tool_node = ToolNode(tools)
-    agent = create_react_agent(llm, tools=tool_node, state_schema=State)
+    agent = get_movie_night_agent()
 
     query = {
         "messages": [{"type": "user", "content": movie_night_prompt}],
         "interaction": interaction,
     }
 
-    respond = await agent.ainvoke(query, stream_mode="values")
+    with outbound_timer("gemini", "movie_night_agent"):
+        respond = await agent.ainvoke(query, stream_mode="values")
     respond = respond["messages"]
 
     for msg in respond:
         msg.pretty_print()
 
 
-bot.run(discord_token)
+if __name__ == "__main__":
+    bot.run(discord_token)
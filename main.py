@@ -1,6 +1,9 @@
+import asyncio
 import discord
+from concurrent.futures.process import BrokenProcessPool
 import os
 import random
+import sys
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 from pathlib import Path
@@ -10,34 +13,82 @@ from discord import app_commands, Poll, EntityType, AllowedMentions
 from discord.utils import sleep_until, utcnow
 from discord.ext.commands import CommandInvokeError
 from discord.errors import HTTPException
-from discord.ext import commands
-from rich.table import Table
+from discord.ext import commands, tasks
 
 from src.constants import (
     ENTICIPATION_SENTENCE_LIST,
     SELECTION_SENTENCE_LIST,
     MOVIE_NIGHT_ROLE_ID,
     VOICE_CHANNEL_ID,
-    PLAYERS_VALORANT_MAPPING,
     MOVIE_NIGHT_CHANNEL_ID,
 )
-from src import *
-from src.imdb import first_result_title_details, prepare_message, test_imdb_api, fetch_info_via_wikipedia
-from src.renderer import render_html, generate_image
+from src.http_client import close_session
+from src.image_cache import image_cache
+from src.executor import run_in_pool, shutdown_pool, start_pool
+from src.command_sync import sync_command_tree
 from src.discord_utils import next_wednesday, discord_timestamps, images_urls_to_bytes_horizontal, random_user
-from schemas import LeaderboardPlayer
+from src.members import bot_options, member_directory, role_index
+from src.metrics import metrics, outbound_timer, record_command, start_metrics_export, stop_metrics_export
 
 
 from src.display_helper import console, success_style, error_style, warning_style
-from src.valorant import RiotAPIClient
-from PIL import Image, ImageDraw, ImageFont
+from src.valorant import CachedRiotAPIClient
 from io import BytesIO
-import requests
+
+# Heavy modules used by a single command (IMDB models, leaderboard renderer, gacha
+# animation, rich tables) are imported inside that command, on its first use.
+# Check the startup import time with: python -m src.import_budget
 
 PARIS_TZ = ZoneInfo("Europe/Paris")
 
 load_dotenv()
-bot = commands.Bot(command_prefix="/", intents=discord.Intents.all())
+
+# Interval between two background refreshes of the Valorant leaderboard
+LEADERBOARD_REFRESH_MINUTES = float(os.getenv("LEADERBOARD_REFRESH_MINUTES", "15"))
+
+
+class PyBot(commands.Bot):
+    async def setup_hook(self):
+        """
+        Warm up the image workers and sync the commands before connecting to Discord.
+        Runs once per process, unlike on_ready which fires again after each reconnect.
+        """
+        # Each worker decodes the gacha animation once now instead of on the first /pull_player
+        await start_pool()
+        # Prometheus endpoint and periodic summary log, if configured
+        await start_metrics_export()
+
+        try:
+            await sync_command_tree(self.tree)
+        except HTTPException as e:
+            console.print(f"Command sync failed: {e}", style=error_style)
+
+        # display commands table
+        from rich.table import Table
+
+        table = Table(title="Registered Commands")
+        table.add_column("Command Name", style="cyan", no_wrap=True)
+        for command in self.tree.walk_commands():
+            table.add_row(command.name)
+        console.print(table)
+
+    async def close(self):
+        """
+        Release shared resources before closing the Discord connection.
+        """
+        await close_session()
+        await stop_metrics_export()
+        # Only loaded if a leaderboard was rendered
+        renderer = sys.modules.get("src.renderer")
+        if renderer is not None:
+            await renderer.browser_pool.close()
+        shutdown_pool()
+        await super().close()
+
+
+bot = PyBot(command_prefix="/", **bot_options())
+# Shared so that cached Riot data is reused between commands
+riot_client = CachedRiotAPIClient()
 
 
 @bot.tree.command(name="random_choice_user")
@@ -54,8 +105,6 @@ async def random_choice_user(
     - Send a message announcing the selected user
     """
     
-    # Randomly select a member
-    selected_member = random_user(interaction, mentions)
     random_preparation_sentence = random.choice(ENTICIPATION_SENTENCE_LIST)
     random_selection_sentence = random.choice(SELECTION_SENTENCE_LIST)
 
@@ -64,14 +113,19 @@ async def random_choice_user(
         random_preparation_sentence,
     )
 
-    # Wait for 3 seconds before announcing the selected user
-    await sleep_until(utcnow() + timedelta(seconds=3))
+    # Randomly select a member (members may have to be fetched) while
+    # waiting for 3 seconds before announcing the selected user
+    selected_member, _ = await asyncio.gather(
+        random_user(interaction, mentions),
+        sleep_until(utcnow() + timedelta(seconds=3)),
+    )
 
     # Send a response with all selected members
-    await interaction.followup.send(
-        f"{random_selection_sentence}".format(nom=f"<@{selected_member}>!"),
-        allowed_mentions=AllowedMentions(users=True, roles=False, everyone=False),
-    )
+    with outbound_timer("discord", "followup"):
+        await interaction.followup.send(
+            f"{random_selection_sentence}".format(nom=f"<@{selected_member}>!"),
+            allowed_mentions=AllowedMentions(users=True, roles=False, everyone=False),
+        )
 
     console.print(f"Random user selected: {selected_member}")
 
@@ -167,6 +221,8 @@ async def movie_night(
     - Create a scheduled event in the guild
     - Send confirmation message
     """
+    from src.imdb import fetch_titles_details, prepare_message, fetch_info_via_wikipedia, imdb_breaker
+
     # Validate input
     if not movies_list or not movies_list.strip():
         await interaction.response.send_message(
@@ -203,60 +259,49 @@ async def movie_night(
     poll_return = await interaction.response.send_message(poll=poll, silent=False)
     console.print(f"Poll created with {len(list_movies)} movies")
 
-    # Verify IMDB API availability before fetching details
-    api_ok, api_error = await test_imdb_api()
-    if api_ok:
-        img_url_list: list[str] = []
-        console.print("IMDB API is reachable")
-        with console.status("[cyan]Getting movie infos..."):
-            for movie_title in list_movies:
-                console.print(f"[cyan]→[/cyan] Getting info for movie: {movie_title}")
-                # Function over here
-                movie_info = await first_result_title_details(movie_title)
-
-                if not movie_info or "error" in movie_info:
-                    console.print(
-                        f"Error retrieving movie info for '{movie_title}': {movie_info.get('error', 'Unknown error')}",
-                        style=warning_style,
-                    )
-                    continue
-
-                message, embed = prepare_message(movie_info)
-                if message and embed:
-                    await interaction.followup.send(embed=embed, ephemeral=False)
-
-                # Collect image URL
-                if movie_info.image_url:
-                    img_url_list.append(movie_info.image_url)
+    img_url_list: list[str] = []
+    # The circuit breaker tracks real IMDB outcomes, no need to probe the API first
+    if imdb_breaker.is_open:
+        console.print(
+            f"IMDB API circuit breaker is open ({imdb_breaker.last_failure}), using Wikipedia",
+            style=warning_style,
+        )
+        movies_info = [{"error": "IMDB API is unavailable"}] * len(list_movies)
     else:
-        console.print(f"IMDB API test failed: {api_error}")
+        with console.status("[cyan]Getting movie infos..."):
+            # All titles are resolved concurrently, results keep the order of the list
+            movies_info = await fetch_titles_details(list_movies)
+
+    imdb_unavailable = imdb_breaker.is_open
+    if imdb_unavailable:
         await interaction.followup.send(
-            f"Warning: IMDB API is not reachable. Movie details will not be fetched. Error: {api_error} \n You can still vote for the movie night, but the movie details will be missing.",
+            f"Warning: IMDB API is not reachable ({imdb_breaker.last_failure}). Movie details will be fetched from Wikipedia instead.",
             ephemeral=True,
         )
-    if not api_ok:
-        # If the IMDB API is not reachable, try to fetch info via Wikipedia
-        console.print("IMDB API is not reachable, trying to fetch info via Wikipedia")
-        for movie_title in list_movies:
+
+    for movie_title, movie_info in zip(list_movies, movies_info):
+        if isinstance(movie_info, dict) and imdb_unavailable:
+            # If the IMDB API is not reachable, try to fetch info via Wikipedia
             console.print(f"[cyan]→[/cyan] Getting info for movie: {movie_title} via Wikipedia")
-            movie_info = fetch_info_via_wikipedia(movie_title)
+            movie_info = await asyncio.to_thread(fetch_info_via_wikipedia, movie_title)
+            if movie_info is None:
+                movie_info = {"error": "Wikipedia page not found"}
 
-            if not movie_info or "error" in movie_info:
-                error_message = movie_info.get('error', 'Unknown error') if movie_info else 'Unknown error'
-                console.print(
-                    f"Error retrieving movie info for '{movie_title}' via Wikipedia: {error_message}",
-                    style=warning_style,
-                )
-                continue
+        if isinstance(movie_info, dict):
+            console.print(
+                f"Error retrieving movie info for '{movie_title}': {movie_info.get('error', 'Unknown error')}",
+                style=warning_style,
+            )
+            continue
 
-            message, embed = prepare_message(movie_info)
-            if message and embed:
+        message, embed = prepare_message(movie_info)
+        if message and embed:
+            with outbound_timer("discord", "followup"):
                 await interaction.followup.send(embed=embed, ephemeral=False)
 
-            # Collect image URL
-            if movie_info.image_url:
-                img_url_list.append(movie_info.image_url)
-    
+        # Collect image URL
+        if movie_info.image_url:
+            img_url_list.append(movie_info.image_url)
 
     reminder_message = (
         f"## Hey <@&{MOVIE_NIGHT_ROLE_ID}> ! Don't forget to vote for the movie night!\n"
@@ -264,10 +309,11 @@ async def movie_night(
         f"({discord_timestamps(next_wednesday() + timedelta(hours=1), format='R')})."
     )
     mention = AllowedMentions(roles=True, users=False, everyone=False)
-    await interaction.followup.send(
-        reminder_message,
-        allowed_mentions=mention,
-    )
+    with outbound_timer("discord", "followup"):
+        await interaction.followup.send(
+            reminder_message,
+            allowed_mentions=mention,
+        )
 
     voice_channel = bot.get_channel(VOICE_CHANNEL_ID)
     if voice_channel is None:
@@ -283,14 +329,21 @@ async def movie_night(
     )
 
     # Create the image for the event banner
+    image_bytes = None
     if img_url_list and len(img_url_list) > 0:
         # Limit to 8 images for the event banner
         console.print(f"Collected {len(img_url_list)} image URLs for the event banner")
         img_url_list = img_url_list[:8]
-        image_bytes = images_urls_to_bytes_horizontal(img_url_list, target_height=300)
-    # If no images were collected, use a default image
+        try:
+            image_bytes = await images_urls_to_bytes_horizontal(img_url_list, target_height=300)
+        except ValueError:
+            console.print("None of the collected images could be used for the event banner", style=warning_style)
+        except (asyncio.TimeoutError, BrokenProcessPool) as e:
+            console.print(f"Event banner creation failed: {type(e).__name__} {e}", style=warning_style)
     else:
         console.print("No image URLs collected for the event banner")
+    # If no banner could be created, use a default image
+    if image_bytes is None:
         background_image_path = Path("assets") / "ComeFarmWarframe.png"
         if background_image_path.exists():
             console.print("Using default background image for the event banner")
@@ -304,16 +357,17 @@ async def movie_night(
             image_bytes = None
         
     try:
-        await interaction.guild.create_scheduled_event(
-            name=interaction.channel.name,
-            description=description,
-            start_time=next_wednesday().astimezone(PARIS_TZ) + timedelta(hours=1),
-            end_time=next_wednesday().astimezone(PARIS_TZ) + timedelta(hours=3),
-            privacy_level=discord.PrivacyLevel.guild_only,
-            entity_type=EntityType.voice,
-            image=image_bytes,
-            channel=voice_channel,
-        )
+        with outbound_timer("discord", "scheduled_event"):
+            await interaction.guild.create_scheduled_event(
+                name=interaction.channel.name,
+                description=description,
+                start_time=next_wednesday().astimezone(PARIS_TZ) + timedelta(hours=1),
+                end_time=next_wednesday().astimezone(PARIS_TZ) + timedelta(hours=3),
+                privacy_level=discord.PrivacyLevel.guild_only,
+                entity_type=EntityType.voice,
+                image=image_bytes,
+                channel=voice_channel,
+            )
     except (CommandInvokeError, HTTPException) as e:
         console.print(f"Error creating scheduled event: {e}")
 
@@ -330,120 +384,136 @@ async def movie_night(
 
 
 @bot.tree.command(name="ranking_valorant")
+@app_commands.describe(force_refresh="Ignore cached Riot data and fetch everything again")
 async def ranking_valorant(
     interaction: discord.Interaction,
+    force_refresh: bool = False,
 ):
     """
     Command to display the Valorant ranking leaderboard.
-    - Fetch player data from Riot API
-    - Build a leaderboard embed
-    - Send the embed as a response
+    - Use the leaderboard pre-rendered in the background if there is one
+    - Otherwise fetch player data from Riot API and render it now
+    - Send the image as a response
     """
     await interaction.response.defer()
-    riot_client = RiotAPIClient()
-    leaderboard_players: list[dict] = []
-    console.print("Fetching player data from Riot API...")
-    with console.status("[cyan]Fetching player data from Riot API..."):
-        for player in PLAYERS_VALORANT_MAPPING:
-            try:
-                player_info = riot_client.get_rank_carrier(player["name"], "eu",player["tag"], "pc").get("data", {})
-                console.print(f"Fetched data for {player['name']}: {player_info}")
-                nb_games = sum(season.get("games", 0) for season in player_info.get("seasonal", []))
-                nb_win = sum(season.get("wins", 0) for season in player_info.get("seasonal", []))
-                leaderboard_players.append({
-                    "name": player_info.get("account", {}).get("name", player["name"]),
-                    "rank": player_info.get("current", {}).get("tier", {}).get("name", "N/A"),
-                    "rr": player_info.get("current", {}).get("rr", "N/A"),
-                    "winrate": (nb_win / nb_games * 100) if nb_games > 0 else 0,
-                    "games": nb_games,
-                    "rank_id": player_info.get("current", {}).get("tier", {}).get("id", "0"),
-                    "discord_id": player["discord_id"],
-                    "tag": player["tag"],
-                })
-            except Exception as e:
-                console.print(f"Error fetching data for {player['name']}: {e}", style=error_style)
-    leaderboard_players.sort(key=lambda x: (x["rank_id"], x["rr"]), reverse=True)
-    for player in leaderboard_players:
-        # Get the player's discord member object        
-        member = interaction.guild.get_member(player["discord_id"])
-        if member:
-            player["avatar"] = str(member.display_avatar.url)
-        else:
-            player["avatar"] = None
-        valorant_account = riot_client.get_player_info(player["name"], player["tag"])
-        player["card"] = valorant_account.get("card", {}).get("large", None)
-    
-    leaderboard_players = [LeaderboardPlayer(**player) for player in leaderboard_players]
-    console.print(leaderboard_players)
-    templates_path = Path("templates")
-    render_path = Path("rendered")
-    if not render_path.exists():
-        render_path.mkdir()
-    rendered_file_path = render_html(templates_path, render_path, leaderboard_players, "Acte 2")
-    
-    leaderboard_img_path = await generate_image(rendered_file_path)
-    await interaction.followup.send(file=discord.File(leaderboard_img_path), ephemeral=False)
+    from src.leaderboard import get_latest_snapshot, refresh_leaderboard
+
+    # The leaderboard is pre-rendered in the background, only rebuild it when needed
+    snapshot = None if force_refresh else get_latest_snapshot(interaction.guild.id)
+    if snapshot is None:
+        console.print("No leaderboard ready, building it on demand...")
+        try:
+            with console.status("[cyan]Fetching player data from Riot API..."):
+                snapshot = await refresh_leaderboard(
+                    riot_client, interaction.guild, force_refresh=force_refresh
+                )
+        except ValueError as e:
+            console.print(f"Error building the leaderboard: {e}", style=error_style)
+            await interaction.followup.send(f"Error: {e}", ephemeral=True)
+            return
+
+    with outbound_timer("discord", "followup_file"):
+        await interaction.followup.send(
+            f"Last updated {discord_timestamps(snapshot.generated_at, format='R')}",
+            file=discord.File(BytesIO(snapshot.image), filename="leaderboard.png"),
+            ephemeral=False,
+        )
+
+
+@tasks.loop(minutes=LEADERBOARD_REFRESH_MINUTES)
+async def refresh_leaderboard_task():
+    """
+    Refresh the Riot data and pre-render the leaderboard of every guild.
+    """
+    from src.leaderboard import refresh_leaderboard
+
+    for guild in bot.guilds:
+        try:
+            await refresh_leaderboard(riot_client, guild)
+        except Exception as e:
+            console.print(f"Background leaderboard refresh failed for {guild.name}: {e}", style=error_style)
+
+
+@refresh_leaderboard_task.before_loop
+async def before_refresh_leaderboard_task():
+    await bot.wait_until_ready()
+
 
 @bot.tree.command(name="pull_player")
 @app_commands.describe(mentions="List of role mentions and/or user mentions separated by spaces")
 async def pull_player(interaction: discord.Interaction, mentions: str):
     """Pull a random player and create a GIF with their avatar and name."""
     await interaction.response.defer()
+    from src.gacha import AVATAR_SIZE, render_pull_gif
 
-    assets_path = Path("assets")
-    # Charger le GIF
-    gif = Image.open(assets_path / "5_star_10_pull.gif")
-    end_frame = Image.open(assets_path / "chosen_player.png")
-    font_path = assets_path / "zh-cn.ttf"
-    gif_path = assets_path / "output.gif"
-    player = random_user(interaction, mentions)
-    player = interaction.guild.get_member(player) if player else None
+    player = await random_user(interaction, mentions)
+    player = await member_directory.get_member(interaction.guild, player) if player else None
     player_name = player.display_name if player else "Unknown Player"
-    response = requests.get(player.display_avatar.with_format("png").url)
-    player_icon = (Image.open(BytesIO(response.content)) 
-        .convert("RGBA") 
-        .resize((150, 150)))
+    avatar = await image_cache.get_resized(player.display_avatar.with_format("png").url, AVATAR_SIZE) if player else None
+
+    # The base animation is decoded once per worker, only the end of the animation is made here.
+    # Encoded in memory so concurrent pulls never share a file
+    try:
+        gif_bytes = await run_in_pool(render_pull_gif, player_name, avatar)
+    except (asyncio.TimeoutError, BrokenProcessPool) as e:
+        console.print(f"Pull animation failed: {type(e).__name__} {e}", style=error_style)
+        await interaction.followup.send("The pull animation could not be created, try again later.", ephemeral=True)
+        return
+    with outbound_timer("discord", "followup_file"):
+        await interaction.followup.send(file=discord.File(BytesIO(gif_bytes), filename="pull.gif"), ephemeral=False)
 
-    width, height = end_frame.size
 
-    draw = ImageDraw.Draw(end_frame)
-    font = ImageFont.truetype(font_path, size=24)
-    draw.text((125, 220), player_name, fill=(255, 255, 255), font=font, anchor="mm")
-    end_frame.paste(player_icon, (int(width/2 - player_icon.width/2) , int(height/2 - player_icon.height/2)), player_icon)
+async def is_bot_owner(interaction: discord.Interaction) -> bool:
+    return await bot.is_owner(interaction.user)
 
-    frames = []
-    try:
-        while True:
-            frame = gif.copy()
-            frames.append(frame)
-            gif.seek(len(frames))  # frame suivante
-    except EOFError:
-        pass
-
-    # Taille de référence
-    width, height = frames[0].size
-
-    # Créer de nouvelles frames programmatiquement
-    new_frames = []
-    nb_frames_to_add = 10
-    for i in range(nb_frames_to_add):
-        # fade_factor = min(i / (nb_frames_to_add / 3) , 1)
-        fade_factor = i / nb_frames_to_add
-        faded_frame = Image.blend(frames[-1], end_frame, alpha=fade_factor)
-        new_frames.append(faded_frame)
-
-    # Ajouter les nouvelles frames à la fin
-    all_frames = frames + new_frames
-
-    # Sauvegarder le nouveau GIF
-    all_frames[0].save(
-        gif_path,
-        save_all=True,
-        append_images=all_frames[1:],
-        duration=gif.info.get("duration", 100),
-        loop=None
+
+def latency_table(rows: dict[str, dict], max_rows: int = 12) -> str:
+    """Code block of the latency summary rows, short enough for an embed field"""
+    if not rows:
+        return "No calls yet"
+    lines = [f"{'name':<24} {'calls':>5} {'err':>4} {'p50':>7} {'p95':>7}"]
+    for name, row in sorted(rows.items(), key=lambda item: -item[1]["calls"])[:max_rows]:
+        lines.append(
+            f"{name[:24]:<24} {row['calls']:>5} {row['errors']:>4} {row['p50_ms']:>5.0f}ms {row['p95_ms']:>5.0f}ms"
+        )
+    return "```\n" + "\n".join(lines) + "\n```"
+
+
+@bot.tree.command(name="bot_stats")
+@app_commands.default_permissions(administrator=True)
+@app_commands.check(is_bot_owner)
+async def bot_stats(interaction: discord.Interaction):
+    """
+    Show the bot metrics since its start (owner only).
+    - Latency and errors of every command and outbound call
+    - Cache hit rates and the IMDB circuit breaker state
+    """
+    from src.imdb import imdb_breaker
+
+    snapshot = metrics.snapshot()
+    embed = discord.Embed(
+        title="Bot stats",
+        description=f"Up for {timedelta(seconds=snapshot['uptime_s'])}",
+        color=discord.Color.blurple(),
     )
-    await interaction.followup.send(file=discord.File(gif_path), ephemeral=False)
+    embed.add_field(name="Commands", value=latency_table(snapshot["commands"]), inline=False)
+    embed.add_field(name="Outbound calls", value=latency_table(snapshot["outbound"]), inline=False)
+    caches = "\n".join(
+        f"{name}: {row['hit_rate']:.0%} of {row['hit'] + row['miss']}" for name, row in snapshot["caches"].items()
+    )
+    embed.add_field(name="Cache hit rates", value=caches[:1024] or "No lookups yet", inline=False)
+    breaker = imdb_breaker.snapshot()
+    embed.add_field(
+        name="IMDB circuit breaker",
+        value=(
+            f"{breaker['state']}, failure rate {breaker['failure_rate']:.0%} over {breaker['window_calls']} calls"
+            + (f", retry in {breaker['retry_in']}s" if breaker["retry_in"] else "")
+            + (f"\nLast failure: {breaker['last_failure']}" if breaker["last_failure"] else "")
+        ),
+        inline=False,
+    )
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
 
 @bot.event
 async def on_ready():
@@ -452,20 +522,64 @@ async def on_ready():
     """
     try:
         console.print(f"Logged on as {bot.user}!", style=success_style)
-        synced = await bot.tree.sync()
-        console.print(f"Synced {len(synced)} command(s)", style=success_style)
 
-        # display commands table
-        table = Table(title="Registered Commands")
-        table.add_column("Command Name", style="cyan", no_wrap=True)
-        for command in bot.tree.walk_commands():
-            table.add_row(command.name)
-        console.print(table)
+        # on_ready fires again after each reconnect
+        if not refresh_leaderboard_task.is_running():
+            refresh_leaderboard_task.start()
 
     except Exception as e:
         console.print(f"Error during bot initialization: {e}", style=error_style)
 
 
+# Latency and errors of every app command, see src/metrics.py
+@bot.event
+async def on_app_command_completion(interaction: discord.Interaction, command: app_commands.Command):
+    record_command(interaction)
+
+
+@bot.tree.error
+async def on_app_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    """
+    Count the failed command, then report the error
+    """
+    record_command(interaction, error)
+    if isinstance(error, app_commands.CheckFailure):
+        send = interaction.followup.send if interaction.response.is_done() else interaction.response.send_message
+        await send("You are not allowed to use this command.", ephemeral=True)
+        return
+
+    command = interaction.command.qualified_name if interaction.command else "unknown"
+    console.print(f"Command /{command} failed: {error}", style=error_style)
+    console.print_exception()
+
+
+# Keep the role index used by random_user in sync with the guilds. Only the full
+# member cache mode has one, lean mode fetches the role members on demand
+if not member_directory.lean:
+
+    @bot.event
+    async def on_member_join(member: discord.Member):
+        role_index.add_member(member)
+
+    @bot.event
+    async def on_member_remove(member: discord.Member):
+        role_index.remove_member(member)
+
+    @bot.event
+    async def on_member_update(before: discord.Member, after: discord.Member):
+        if before.roles != after.roles:
+            role_index.update_member(before, after)
+
+    @bot.event
+    async def on_guild_role_delete(role: discord.Role):
+        role_index.remove_role(role)
+
+
+@bot.event
+async def on_guild_remove(guild: discord.Guild):
+    member_directory.forget_guild(guild.id)
+
+
 @bot.event
 async def on_error(event, *args, **kwargs):
     """
@@ -475,9 +589,11 @@ async def on_error(event, *args, **kwargs):
     console.print_exception()
 
 
-try:
-    bot.run(os.getenv("DISCORD_TOKEN"))
-except ValueError:
-    console.print("DISCORD_TOKEN not found in .env file")
-except Exception as e:
-    console.print(f"Failed to start bot: {e}", style=error_style)
+# The image workers re-import this module, only the main process runs the bot
+if __name__ == "__main__":
+    try:
+        bot.run(os.getenv("DISCORD_TOKEN"))
+    except ValueError:
+        console.print("DISCORD_TOKEN not found in .env file")
+    except Exception as e:
+        console.print(f"Failed to start bot: {e}", style=error_style)
@@ -12,6 +12,6 @@ class LeaderboardPlayer(BasePlayer):
     winrate: float
     games: int
     rank_id: int
-    card: str
-    avatar: str
+    card: str | None = None
+    avatar: str | None = None
     rank_leaderboard: int = 0
\ No newline at end of file
@@ -1,10 +1,8 @@
-from src.utils import *
-from src.display_helper import console, success_style, error_style, warning_style
+import importlib
 
 __all__ = [
     "get_role_id_from_mention",
     "get_user_id_from_mention",
-    "check_if_user_exist",
     "next_wednesday",
     "parse_mentions",
     "fetch_user_from_role",
@@ -15,3 +13,14 @@ __all__ = [
     "discord_timestamps",
     "images_urls_to_bytes_horizontal"
 ]
+
+_DISPLAY_HELPER_NAMES = {"console", "success_style", "error_style", "warning_style"}
+
+
+def __getattr__(name: str):
+    # Resolved on first access so that importing any src submodule does not load src.discord_utils
+    if name in _DISPLAY_HELPER_NAMES:
+        return getattr(importlib.import_module("src.display_helper"), name)
+    if name in __all__:
+        return getattr(importlib.import_module("src.discord_utils"), name)
+    raise AttributeError(f"module 'src' has no attribute {name!r}")
@@ -0,0 +1,48 @@
+"""
+Local copy of the web font used to render the leaderboard
+"""
+
+import hashlib
+import re
+from pathlib import Path
+
+from src.cache import DiskCache
+from src.constants import DATA_DIR
+from src.image_cache import image_cache
+
+ASSETS_CACHE_DIR = DATA_DIR / "assets"
+STYLESHEETS_MAX_BYTES = 1024 * 1024
+FONT_STYLESHEET_URL = "https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700;800&display=swap"
+# Google Fonts chooses the font format from the user agent, this one gets woff2 files
+FONTS_USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+
+# Stylesheets rewritten to point to the cached fonts, keyed by their content
+stylesheet_cache = DiskCache(ASSETS_CACHE_DIR, STYLESHEETS_MAX_BYTES, suffix=".css")
+
+
+async def fetch_font_stylesheet(fonts_url_path: str, url: str = FONT_STYLESHEET_URL) -> Path | None:
+    """
+    Cache a Google Fonts stylesheet with its font files.
+    The stylesheet and the fonts are downloaded (and revalidated, or retried after a failure)
+    by the shared image cache. The returned local stylesheet points to the cached font files,
+    served under `fonts_url_path`. Returns None when a file cannot be downloaded.
+    """
+    original = await image_cache.get(url, headers={"User-Agent": FONTS_USER_AGENT})
+    if original is None:
+        return None
+
+    stylesheet = original.decode("utf-8")
+    font_urls = re.findall(r"url\((https://[^)]+)\)", stylesheet)
+    fonts = await image_cache.get_paths(font_urls)
+    if len(fonts) != len(set(font_urls)):
+        # Incomplete, try again on the next render
+        return None
+
+    for font_url, font_path in fonts.items():
+        stylesheet = stylesheet.replace(font_url, f"{fonts_url_path}/{font_path.name}")
+    content = stylesheet.encode("utf-8")
+    key = hashlib.sha256(content).hexdigest()[:32]
+    path = stylesheet_cache.path(key)
+    if not path.exists():
+        stylesheet_cache.set(key, content)
+    return path
@@ -0,0 +1,254 @@
+"""
+Caching helpers shared by the API clients
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+from src.display_helper import console, warning_style
+from src.metrics import record_cache
+
+# How long a value reloaded from disk stays in memory before the disk is checked again
+MEMORY_REFILL_TTL = 60  # seconds
+
+
+class PersistentCache:
+    """
+    Key/value cache stored in a SQLite database so it survives bot restarts.
+
+    Values are serialized as JSON and grouped by namespace. Each entry has its
+    own time to live (`None` keeps it forever) and the least recently used
+    entries are evicted once the cache holds more than `max_entries`.
+    """
+
+    def __init__(self, path: Path, max_entries: int = 5000):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(
+                self.path, check_same_thread=False, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL,"
+                " last_access REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS cache_last_access ON cache (last_access)"
+            )
+            self._connection = connection
+        return self._connection
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        """Return the cached value, or `default` if it is missing or expired"""
+        now = time.time()
+        try:
+            with self._lock:
+                connection = self._connect()
+                row = connection.execute(
+                    "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                    (namespace, key),
+                ).fetchone()
+                if row is None:
+                    record_cache(namespace, "sqlite", hit=False)
+                    return default
+
+                value, expires_at = row
+                if expires_at is not None and expires_at <= now:
+                    connection.execute(
+                        "DELETE FROM cache WHERE namespace = ? AND key = ?",
+                        (namespace, key),
+                    )
+                    record_cache(namespace, "sqlite", hit=False)
+                    return default
+
+                connection.execute(
+                    "UPDATE cache SET last_access = ? WHERE namespace = ? AND key = ?",
+                    (now, namespace, key),
+                )
+        except sqlite3.Error as e:
+            console.print(f"Cache read failed ({self.path}): {e}", style=warning_style)
+            return default
+
+        record_cache(namespace, "sqlite", hit=True)
+        return json.loads(value)
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float | None) -> None:
+        """Store a JSON-serializable value for `ttl` seconds (`None` = no expiry)"""
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        try:
+            with self._lock:
+                connection = self._connect()
+                connection.execute(
+                    "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at, last_access)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (namespace, key, json.dumps(value), expires_at, now),
+                )
+                self._evict(connection, now)
+        except sqlite3.Error as e:
+            console.print(f"Cache write failed ({self.path}): {e}", style=warning_style)
+
+    def delete(self, namespace: str, key: str) -> None:
+        """Remove a single entry"""
+        try:
+            with self._lock:
+                self._connect().execute(
+                    "DELETE FROM cache WHERE namespace = ? AND key = ?",
+                    (namespace, key),
+                )
+        except sqlite3.Error as e:
+            console.print(f"Cache delete failed ({self.path}): {e}", style=warning_style)
+
+    def _evict(self, connection: sqlite3.Connection, now: float) -> None:
+        """Drop expired entries, then the least recently used ones above the size cap"""
+        (count,) = connection.execute("SELECT COUNT(*) FROM cache").fetchone()
+        if count <= self.max_entries:
+            return
+
+        connection.execute(
+            "DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)
+        )
+        (count,) = connection.execute("SELECT COUNT(*) FROM cache").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            connection.execute(
+                "DELETE FROM cache WHERE rowid IN"
+                " (SELECT rowid FROM cache ORDER BY last_access ASC LIMIT ?)",
+                (overflow,),
+            )
+
+    def close(self) -> None:
+        """Close the underlying database connection"""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class TTLCache:
+    """
+    In-memory cache with a time to live per entry and LRU eviction.
+
+    When a `PersistentCache` is given as `backend`, entries are also written
+    to disk and memory misses are looked up there, so they survive restarts.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        backend: PersistentCache | None = None,
+        namespace: str = "default",
+    ):
+        self.max_entries = max_entries
+        self.backend = backend
+        self.namespace = namespace
+        self._entries: OrderedDict[str, tuple[float | None, Any]] = OrderedDict()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return the cached value, or `default` if it is missing or expired"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at is None or expires_at > time.time():
+                self._entries.move_to_end(key)
+                record_cache(self.namespace, "memory", hit=True)
+                return value
+            del self._entries[key]
+
+        # A memory miss looked up on disk is counted again by the backend
+        record_cache(self.namespace, "memory", hit=False)
+        if self.backend is not None:
+            value = self.backend.get(self.namespace, key)
+            if value is not None:
+                # The remaining disk TTL is unknown here, keep it in memory for a short while
+                self._store(key, value, time.time() + MEMORY_REFILL_TTL)
+                return value
+        return default
+
+    def set(self, key: str, value: Any, ttl: float | None) -> None:
+        """Store a value for `ttl` seconds (`None` = no expiry)"""
+        self._store(key, value, time.time() + ttl if ttl is not None else None)
+        if self.backend is not None:
+            self.backend.set(self.namespace, key, value, ttl)
+
+    def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+        if self.backend is not None:
+            self.backend.delete(self.namespace, key)
+
+    def _store(self, key: str, value: Any, expires_at: float | None) -> None:
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class DiskCache:
+    """
+    Binary blobs stored as files in a directory, one file per key.
+
+    The file modification time is used as the last access time: once the total
+    size goes over `max_bytes`, the least recently used files are deleted.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, suffix: str = ""):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+
+    def path(self, key: str) -> Path:
+        return self.directory / f"{key}{self.suffix}"
+
+    def get(self, key: str) -> bytes | None:
+        """Return the stored bytes, or None if the key is unknown"""
+        path = self.path(key)
+        try:
+            data = path.read_bytes()
+            path.touch()  # mark as recently used
+        except FileNotFoundError:
+            record_cache(self.directory.name, "disk", hit=False)
+            return None
+        record_cache(self.directory.name, "disk", hit=True)
+        return data
+
+    def set(self, key: str, data: bytes) -> None:
+        """Store bytes under a key, then evict old entries if over budget"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path(key)
+        # Write then rename so a concurrent reader never sees a partial file
+        temporary_path = path.with_name(path.name + ".part")
+        temporary_path.write_bytes(data)
+        temporary_path.replace(path)
+        self._evict()
+
+    def _evict(self) -> None:
+        files = []
+        for path in self.directory.glob(f"*{self.suffix}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files, key=lambda entry: entry[0]):
+            if total_size <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total_size -= size
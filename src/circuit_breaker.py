@@ -0,0 +1,150 @@
+"""
+Circuit breaker used to stop calling an API that keeps failing
+"""
+
+import time
+from collections import deque
+from contextlib import contextmanager
+from enum import Enum
+from typing import Iterator
+
+from src.display_helper import console, success_style, warning_style
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Track the outcome of the last requests sent to an API.
+
+    - closed: requests flow normally, outcomes are recorded in a sliding window
+    - open: the failure rate went over the threshold, requests are rejected
+    - half_open: after `recovery_timeout` seconds a limited number of probe
+      requests go through; a success closes the circuit, a failure re-opens it
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        minimum_calls: int = 4,
+        window_size: int = 20,
+        recovery_timeout: float = 60.0,
+        half_open_max_calls: int = 1,
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.minimum_calls = minimum_calls
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self._outcomes: deque[bool] = deque(maxlen=window_size)
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        # Incremented on every state change, tells whether a probe got an outcome
+        self._generation = 0
+        self.last_failure: str | None = None
+
+    @property
+    def state(self) -> CircuitState:
+        """Current state, moving from open to half-open once the recovery timeout elapsed"""
+        if (
+            self._state is CircuitState.OPEN
+            and time.monotonic() - self._opened_at >= self.recovery_timeout
+        ):
+            self._transition(CircuitState.HALF_OPEN)
+        return self._state
+
+    @property
+    def is_open(self) -> bool:
+        """True when requests are currently rejected"""
+        return self.state is CircuitState.OPEN
+
+    def allow_request(self) -> bool:
+        """Return True if a request may be sent now (reserves a probe slot when half-open)"""
+        state = self.state
+        if state is CircuitState.CLOSED:
+            return True
+        if state is CircuitState.HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+            self._half_open_calls += 1
+            return True
+        return False
+
+    @contextmanager
+    def request_slot(self) -> Iterator[bool]:
+        """
+        Same as `allow_request`, as a context manager yielding whether the request may be sent.
+        A half-open probe slot is given back on exit when the request ended without
+        `record_success` / `record_failure` (task cancelled, unexpected error), so the
+        breaker is never left waiting for an outcome that will not come.
+        """
+        allowed = self.allow_request()
+        probe = allowed and self._state is CircuitState.HALF_OPEN
+        generation = self._generation
+        try:
+            yield allowed
+        finally:
+            if probe and self._generation == generation and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def record_success(self) -> None:
+        """Record a request that reached the API and got a usable answer"""
+        if self._state is CircuitState.HALF_OPEN:
+            self._transition(CircuitState.CLOSED)
+            return
+        self._outcomes.append(True)
+
+    def record_failure(self, reason: str) -> None:
+        """Record a failed request (timeout, rate limit, server or network error)"""
+        self.last_failure = reason
+        if self._state is CircuitState.HALF_OPEN:
+            self._transition(CircuitState.OPEN)
+            return
+
+        self._outcomes.append(False)
+        if len(self._outcomes) >= self.minimum_calls and self.failure_rate >= self.failure_rate_threshold:
+            self._transition(CircuitState.OPEN)
+
+    @property
+    def failure_rate(self) -> float:
+        """Failure rate over the sliding window"""
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def _transition(self, new_state: CircuitState) -> None:
+        if new_state is self._state:
+            return
+        self._state = new_state
+        self._half_open_calls = 0
+        self._generation += 1
+        if new_state is CircuitState.OPEN:
+            self._opened_at = time.monotonic()
+            console.print(
+                f"Circuit '{self.name}' opened: {self.last_failure}", style=warning_style
+            )
+        elif new_state is CircuitState.CLOSED:
+            self._outcomes.clear()
+            console.print(f"Circuit '{self.name}' closed", style=success_style)
+
+    def snapshot(self) -> dict:
+        """Diagnostic view of the breaker"""
+        state = self.state
+        retry_in = (
+            max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at))
+            if state is CircuitState.OPEN
+            else 0.0
+        )
+        return {
+            "name": self.name,
+            "state": state.value,
+            "failure_rate": round(self.failure_rate, 3),
+            "window_calls": len(self._outcomes),
+            "last_failure": self.last_failure,
+            "retry_in": round(retry_in, 1),
+        }
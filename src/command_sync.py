@@ -0,0 +1,75 @@
+"""
+Slash command synchronization, skipped when the command tree did not change
+"""
+
+import hashlib
+import json
+import os
+
+import discord
+from discord import app_commands
+
+from src.constants import DATA_DIR
+from src.display_helper import console, success_style, warning_style
+
+# Fingerprints of the last synced command trees
+SYNC_STATE_PATH = DATA_DIR / "command_sync.json"
+# Commands are synced to this guild only when set: guild commands update
+# instantly, which is handy while developing (global ones can take a while)
+DEV_GUILD_ID = int(os.getenv("DEV_GUILD_ID", "0")) or None
+
+
+def tree_fingerprint(tree: app_commands.CommandTree, guild: discord.abc.Snowflake | None = None) -> str:
+    """Hash of the commands as sent to Discord: names, parameters, descriptions, permissions..."""
+    payload = sorted(
+        (command.to_dict(tree) for command in tree.get_commands(guild=guild)),
+        key=lambda command: (command.get("type", 1), command["name"]),
+    )
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _load_state() -> dict[str, str]:
+    try:
+        return json.loads(SYNC_STATE_PATH.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        console.print(f"Could not read {SYNC_STATE_PATH}: {e}", style=warning_style)
+        return {}
+
+
+def _save_state(state: dict[str, str]) -> None:
+    SYNC_STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    temporary_path = SYNC_STATE_PATH.with_name(SYNC_STATE_PATH.name + ".part")
+    temporary_path.write_text(json.dumps(state, indent=2), encoding="utf-8")
+    temporary_path.replace(SYNC_STATE_PATH)
+
+
+async def sync_command_tree(
+    tree: app_commands.CommandTree,
+    guild_id: int | None = DEV_GUILD_ID,
+    force: bool = False,
+) -> bool:
+    """
+    Sync the command tree with Discord if it changed since the last sync.
+    - `guild_id`: sync the global commands to this guild only (development)
+    - `force`: sync even if the fingerprint did not change
+    Returns True when a sync was sent.
+    """
+    guild = discord.Object(id=guild_id) if guild_id else None
+    if guild is not None:
+        tree.copy_global_to(guild=guild)
+
+    # The same data directory may be used by several bot applications
+    scope = f"{tree.client.application_id}:{guild_id or 'global'}"
+    fingerprint = tree_fingerprint(tree, guild)
+    state = _load_state()
+    if not force and state.get(scope) == fingerprint:
+        console.print(f"Command tree unchanged, skipping sync ({scope})")
+        return False
+
+    synced = await tree.sync(guild=guild)
+    console.print(f"Synced {len(synced)} command(s) ({scope})", style=success_style)
+    state[scope] = fingerprint
+    _save_state(state)
+    return True
@@ -2,6 +2,14 @@
 Constants used throughout the Discord bot
 """
 
+import os
+from pathlib import Path
+
+# Directory holding the bot's persistent state (caches, databases...)
+DATA_DIR = Path(os.getenv("PYBOT_DATA_DIR", "data"))
+# "development" reloads edited templates without restarting the bot
+DEVELOPMENT = os.getenv("PYBOT_ENV", "production").lower() == "development"
+
 ENTICIPATION_SENTENCE_LIST = [
     "## Attention, mesdames et messieurs, préparez-vous à accueillir… un(e) grand(e) gagnant(e) ! Le suspense est insoutenable…",
     "## Le sort a parlé ! Mais qui est l'élu(e) de cette grande cérémonie de… hasard total ?",
@@ -28,6 +36,9 @@ VOICE_CHANNEL_ID = 667070663038861312 # Real
 
 USER_TO_NOTIFY = [295236862207852544, 221658647862837248]
 
+# Act label displayed on the Valorant leaderboard
+LEADERBOARD_ACT = "Acte 2"
+
 PLAYERS_VALORANT_MAPPING = [
             {"name": "White Chroma", "tag": "EUW", "discord_id": 295236862207852544},
             {"name": "Ayromme", "tag": "EUW", "discord_id": 284779124382236672},
@@ -2,33 +2,52 @@
 Utility functions for the Discord bot
 """
 
+import asyncio
+import re
 import discord
-import requests
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
-from PIL import Image
 from io import BytesIO
 import random
+from typing import TYPE_CHECKING
 
 from src.display_helper import console, success_style, error_style, warning_style
+from src.executor import run_in_pool
+from src.image_cache import image_cache
+from src.members import member_directory
+
+if TYPE_CHECKING:
+    from PIL import Image
 
 
 PARIS_TZ = ZoneInfo("Europe/Paris")
 
+# <@id> user, <@!id> user (nickname form), <@&id> role
+MENTION_PATTERN = re.compile(r"<@(!|&)?(\d+)>")
+
+# Maximum number of images downloaded at the same time
+MAX_CONCURRENT_DOWNLOADS = 8
+# Discord rejects scheduled event cover images above this size
+EVENT_BANNER_MAX_BYTES = 8 * 1024 * 1024
+# JPEG qualities tried in order until the banner fits in the size limit
+BANNER_JPEG_QUALITIES = (90, 85, 80, 70, 60, 50)
+
+
+def _mention_id(mention: str) -> int:
+    match = MENTION_PATTERN.fullmatch(mention.strip())
+    if match is None:
+        raise ValueError(f"Invalid mention: {mention}")
+    return int(match.group(2))
+
 
 def get_role_id_from_mention(mention: str) -> int:
     """Extract role ID from a Discord role mention string"""
-    return int(mention.replace("<@&", "").replace(">", ""))
+    return _mention_id(mention)
 
 
 def get_user_id_from_mention(mention: str) -> int:
     """Extract user ID from a Discord user mention string"""
-    return int(mention.replace("<@", "").replace(">", ""))
-
-
-def check_if_user_exist(user_id: int, all_user: list) -> bool:
-    """Check if a user exists in a list of users"""
-    return bool([user for user in all_user if user.id == user_id])
+    return _mention_id(mention)
 
 
 def next_wednesday(date_reference: datetime = None) -> datetime:
@@ -61,105 +80,142 @@ def discord_timestamps(date: datetime, format: str = "f") -> str:
     return f"<t:{timestamp}:{format}>"
 
 
-def images_urls_to_bytes_horizontal(
-    urls: list[str], target_height: int | None = None, background=(255, 255, 255, 0)
+async def download_images(
+    urls: list[str], target_height: int | None = None, max_concurrency: int = MAX_CONCURRENT_DOWNLOADS
+) -> list[bytes]:
+    """
+    Fetch images concurrently through the shared image cache, already resized to
+    `target_height` when given. Images that cannot be fetched are skipped, the others keep their order.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _download(url: str) -> bytes | None:
+        async with semaphore:
+            if target_height is None:
+                return await image_cache.get(url)
+            return await image_cache.get_resized(url, (None, target_height))
+
+    results = await asyncio.gather(*(_download(url) for url in urls))
+    return [content for content in results if content is not None]
+
+
+def _open_at_height(content: bytes, target_height: int | None) -> "Image.Image | None":
+    """Decode an image straight at (about) the target height, None if it cannot be decoded"""
+    from PIL import Image
+
+    try:
+        img = Image.open(BytesIO(content))
+        if target_height is not None and img.height > target_height:
+            target_size = (max(1, round(img.width * target_height / img.height)), target_height)
+            # JPEG only: let the decoder downscale by 1/2, 1/4 or 1/8 instead of decoding every pixel
+            img.draft("RGB", target_size)
+        img.load()
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        console.print(f"Could not decode image: {e}", style=warning_style)
+        return None
+    return img
+
+
+def _encode_bounded_jpeg(img: "Image.Image", max_bytes: int) -> bytes:
+    """Encode as JPEG, lowering the quality then the size until it fits in `max_bytes`"""
+    from PIL import Image
+
+    while True:
+        for quality in BANNER_JPEG_QUALITIES:
+            buffer = BytesIO()
+            img.save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
+            if buffer.tell() <= max_bytes:
+                return buffer.getvalue()
+        if img.width <= 64:
+            return buffer.getvalue()
+        # The encoded size roughly follows the pixel count
+        scale = min(0.9, max(0.5, (max_bytes / buffer.tell()) ** 0.5))
+        img = img.resize((int(img.width * scale), int(img.height * scale)), Image.LANCZOS)
+
+
+def compose_banner(
+    images: list[bytes],
+    target_height: int | None = None,
+    background=(255, 255, 255),
+    max_bytes: int = EVENT_BANNER_MAX_BYTES,
 ) -> bytes:
     """
-    Download images from URLs, resize them to the same height, concatenate them horizontally, and return the result as bytes.
+    Resize images to the same height, concatenate them horizontally and return a JPEG
+    of at most `max_bytes`. Images that cannot be decoded are skipped.
+    Runs in the image process pool, Pillow is only imported there.
     """
+    from PIL import Image
 
-    images: list[Image.Image] = []
-
-    for url in urls:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        img = Image.open(BytesIO(response.content)).convert("RGBA")
-        images.append(img)
-
-    if not images:
+    decoded = [img for img in (_open_at_height(content, target_height) for content in images) if img]
+    if not decoded:
         raise ValueError("Aucune image fournie")
 
     if target_height is None:
-        target_height = max(img.height for img in images)
-
-    resized_images: list[Image.Image] = []
-    total_width = 0
+        target_height = max(img.height for img in decoded)
 
-    for img in images:
-        ratio = target_height / img.height
-        new_width = int(img.width * ratio)
-        resized = img.resize((new_width, target_height), Image.LANCZOS)
-        resized_images.append(resized)
-        total_width += new_width
+    resized_images: list["Image.Image"] = []
+    for img in decoded:
+        img = img.convert("RGBA")
+        new_width = max(1, round(img.width * target_height / img.height))
+        if img.size != (new_width, target_height):
+            # reducing_gap shrinks large images with a fast box reduce before LANCZOS
+            img = img.resize((new_width, target_height), Image.LANCZOS, reducing_gap=3.0)
+        resized_images.append(img)
 
-    final_img = Image.new("RGBA", (total_width, target_height), background)
+    final_img = Image.new("RGB", (sum(img.width for img in resized_images), target_height), background)
 
     x_offset = 0
     for img in resized_images:
         final_img.paste(img, (x_offset, 0), img)
         x_offset += img.width
 
-    buffer = BytesIO()
-    final_img.save(buffer, format="PNG")
-    buffer.seek(0)
-
-    return buffer.getvalue()
+    return _encode_bounded_jpeg(final_img, max_bytes)
 
 
-def parse_mentions(
-    mentions: list[str],
-    all_users: list[discord.Member],
-) -> tuple[list[int], list[str]]:
+async def images_urls_to_bytes_horizontal(
+    urls: list[str], target_height: int | None = None, background=(255, 255, 255)
+) -> bytes:
     """
-    Parse a list of Discord mentions and separate user mentions from role mentions.
+    Download images from URLs, resize them to the same height, concatenate them horizontally, and return the result as bytes.
+    - Images are fetched concurrently from the image cache, the ones that fail are left out
+    - The banner is composed in the image process pool and encoded as a size-bounded JPEG
     """
-    members_mentions: list[int] = []
-    role_mentions: list[str] = []
+    images = await download_images(urls, target_height)
+    return await run_in_pool(compose_banner, images, target_height, background)
 
-    for mention in mentions:
-        # Skip @everyone and @here mentions
-        if mention == "@everyone" or mention == "@here":
-            console.print(
-                f"Mention '{mention}' not supported, skipping...", style=warning_style
-            )
-            continue
-        if not mention.startswith("<@&"):
-            # User mention
-            user_id = get_user_id_from_mention(mention)
-            if check_if_user_exist(user_id, all_users):
-                # User exists
-                members_mentions.append(user_id)
-            else:
-                console.print(
-                    f"User {mention} not found in server", style=warning_style
-                )
-        else:
-            role_mentions.append(mention)
 
-    return members_mentions, role_mentions
+def parse_mentions(mentions: str) -> tuple[set[int], set[int]]:
+    """
+    Parse Discord mentions (`<@id>`, `<@!id>`, `<@&id>`) and separate user mentions from role mentions.
+    Returns the mentioned user IDs and role IDs.
+    """
+    if "@everyone" in mentions or "@here" in mentions:
+        console.print("Mentions @everyone and @here are not supported, skipping...", style=warning_style)
+
+    user_ids: set[int] = set()
+    role_ids: set[int] = set()
+    for match in MENTION_PATTERN.finditer(mentions):
+        kind, mention_id = match.group(1), int(match.group(2))
+        (role_ids if kind == "&" else user_ids).add(mention_id)
+    return user_ids, role_ids
 
 
-def fetch_user_from_role(
-    role_mention: str,
-    all_users: list[discord.Member],
-) -> list[int]:
+async def fetch_user_from_role(
+    role_id: int,
+    guild: discord.Guild,
+) -> set[int]:
     """
     Collect user IDs of all members who have a specific role.
     """
-    role_id = get_role_id_from_mention(role_mention)
-    selected_members: list[int] = []
-
-    for member in all_users:
-        if any(role.id == role_id for role in member.roles):
-            selected_members.append(member.id)
+    selected_members = await member_directory.role_members(guild, role_id)
 
     if not selected_members:
-        console.print(f"No users found with role {role_mention}", style=warning_style)
+        console.print(f"No users found with role <@&{role_id}>", style=warning_style)
 
     return selected_members
 
 
-def random_user(interaction: discord.Interaction, mentions: str) -> int | None:
+async def random_user(interaction: discord.Interaction, mentions: str) -> int | None:
     """
     Randomly select a user from a list of role mentions and/or user mentions.
     - Parse mentions to get user IDs
@@ -172,17 +228,20 @@ def random_user(interaction: discord.Interaction, mentions: str) -> int | None:
         return None
 
     # Extract mentions
-    mentions = mentions.split()
-    members_mentions, role_mentions = parse_mentions(
-        mentions, interaction.guild.members
-    )
+    guild = interaction.guild
+    user_ids, role_ids = parse_mentions(mentions)
 
-    # Process role mentions to get user IDs
-    for role_mention in role_mentions:
-        members_in_role = fetch_user_from_role(role_mention, interaction.guild.members)
-        members_mentions += members_in_role
+    # Only keep the mentioned users that are members of the server
+    members_mentions = set(await member_directory.get_members(guild, user_ids))
+    for user_id in user_ids - members_mentions:
+        console.print(f"User <@{user_id}> not found in server", style=warning_style)
 
-    members_mentions = list(set([int(user_id) for user_id in members_mentions]))
+    # Process role mentions to get user IDs, every role is resolved by the same lookup
+    role_members = await member_directory.roles_members(guild, role_ids)
+    for role_id, member_ids in role_members.items():
+        if not member_ids:
+            console.print(f"No users found with role <@&{role_id}>", style=warning_style)
+    members_mentions = members_mentions.union(*role_members.values())
 
     # Check if any members were selected
     if not members_mentions:
@@ -190,10 +249,11 @@ def random_user(interaction: discord.Interaction, mentions: str) -> int | None:
         return None
 
     # Randomly select a member
-    selected_member = random.choice(members_mentions)
+    selected_member = random.choice(tuple(members_mentions))
     console.print(f"Random user selected: {selected_member}")
     return selected_member
 
+
 def get_account_info(member: discord.Member) -> dict | None:
     """
     Simulate fetching account info for a member from a database.
@@ -0,0 +1,84 @@
+"""
+Process pool running the CPU-bound image work away from the Discord event loop
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Callable
+
+from src.display_helper import console, success_style, warning_style
+from src.metrics import outbound_timer
+
+# Worker processes, kept low: the bot usually shares a small machine
+MAX_WORKERS = int(os.getenv("IMAGE_WORKERS", str(min(2, os.cpu_count() or 1))))
+# A job taking longer than this is abandoned and its command fails
+JOB_TIMEOUT = 60  # seconds
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def _warm_worker() -> None:
+    """Run once in every worker: decode the assets before the first job needs them"""
+    from src.gacha import load_gacha_assets
+
+    load_gacha_assets()
+
+
+def _ready() -> bool:
+    return True
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """Return the process pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        # spawn: forking a process that runs an event loop and threads is unsafe
+        _pool = ProcessPoolExecutor(
+            max_workers=MAX_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_worker,
+        )
+    return _pool
+
+
+async def start_pool() -> None:
+    """Start every worker and wait until their assets are loaded"""
+    loop = asyncio.get_running_loop()
+    pool = get_pool()
+    await asyncio.gather(*(loop.run_in_executor(pool, _ready) for _ in range(MAX_WORKERS)))
+    console.print(f"Image process pool started with {MAX_WORKERS} worker(s)", style=success_style)
+
+
+def shutdown_pool() -> None:
+    """Stop the workers, pending jobs are cancelled"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def run_in_pool(func: Callable, *args: Any, timeout: float = JOB_TIMEOUT) -> Any:
+    """
+    Run `func(*args)` in a worker process and return its result.
+    - `func` and its arguments must be picklable (module-level functions, bytes...)
+    - Raises asyncio.TimeoutError after `timeout` seconds. A job that has not started
+      yet is cancelled, a running one finishes in the background and is ignored
+    - A crashed pool is replaced, so the next job gets fresh workers
+    - Its duration, waiting time included, is recorded under the "pillow" service
+    """
+    global _pool
+    loop = asyncio.get_running_loop()
+    pool = get_pool()
+    try:
+        with outbound_timer("pillow", func.__name__):
+            return await asyncio.wait_for(loop.run_in_executor(pool, partial(func, *args)), timeout)
+    except BrokenProcessPool:
+        console.print("Image process pool crashed, restarting it", style=warning_style)
+        if _pool is pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+        raise
@@ -0,0 +1,24 @@
+"""
+TrueType fonts shared by the Pillow drawings (leaderboard, gacha animation)
+"""
+
+import os
+from pathlib import Path
+
+from PIL import ImageFont
+
+# Fonts tried for regular text, Pillow's embedded font is the last resort
+TEXT_FONT_CANDIDATES = [
+    os.getenv("LEADERBOARD_TEXT_FONT", ""),
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "C:/Windows/Fonts/segoeui.ttf",
+]
+
+
+def load_text_font(size: int, *preferred: str | Path) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
+    """The first installed font among `preferred` then TEXT_FONT_CANDIDATES, at `size`"""
+    for candidate in (*preferred, *TEXT_FONT_CANDIDATES):
+        if candidate and Path(candidate).is_file():
+            return ImageFont.truetype(str(candidate), size)
+    return ImageFont.load_default(size)
@@ -0,0 +1,157 @@
+"""
+Gacha animation of the /pull_player command
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from PIL import Image, ImageDraw, ImageFont
+
+from src.display_helper import console, warning_style
+from src.fonts import load_text_font
+
+if TYPE_CHECKING:
+    import numpy as np
+
+GACHA_ASSETS_PATH = Path(__file__).resolve().parent.parent / "assets"
+PULL_GIF_PATH = GACHA_ASSETS_PATH / "5_star_10_pull.gif"
+END_FRAME_PATH = GACHA_ASSETS_PATH / "chosen_player.png"
+FONT_PATH = GACHA_ASSETS_PATH / "zh-cn.ttf"
+FONT_SIZE = 24
+
+# Player card drawn on the end frame
+AVATAR_SIZE = (150, 150)
+NAME_POSITION = (125, 220)
+# Fade from the last frame of the animation to the end frame
+FADE_FRAMES = 10
+DEFAULT_FRAME_DURATION = 100  # ms
+# Every n-th frame of the animation is sampled to build the shared GIF palette
+PALETTE_SAMPLE_STEP = 8
+
+
+@dataclass(frozen=True)
+class GachaAssets:
+    """
+    Decoded animation assets, shared by every call and never modified.
+    The frames are already quantized to `palette`, so the GIF encoder never
+    has to compute a palette for the base animation again.
+    """
+
+    frames: tuple[Image.Image, ...]
+    durations: tuple[int, ...]
+    palette: Image.Image
+    last_frame: "np.ndarray"
+    end_frame: Image.Image
+    font: ImageFont.FreeTypeFont | ImageFont.ImageFont
+
+
+def _load_font() -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
+    """The gacha font, or a regular text font when it is not installed"""
+    if not FONT_PATH.is_file():
+        console.print(f"Font {FONT_PATH} not found, using a regular text font", style=warning_style)
+    return load_text_font(FONT_SIZE, FONT_PATH)
+
+
+def _build_palette(frames: list[Image.Image]) -> Image.Image:
+    """Single 256 colors palette covering a sample of frames of the same size"""
+    width, height = frames[0].size
+    sample = Image.new("RGB", (width, height * len(frames)))
+    for index, frame in enumerate(frames):
+        sample.paste(frame, (0, index * height))
+    quantized = sample.quantize(256, method=Image.Quantize.MEDIANCUT)
+    # Only the palette is kept, a small image makes quantize(palette=...) cheap
+    palette = Image.new("P", (1, 1))
+    palette.putpalette(quantized.getpalette())
+    return palette
+
+
+@lru_cache(maxsize=1)
+def load_gacha_assets() -> GachaAssets:
+    """
+    Decode the animation once:
+    - every frame with its duration, quantized once to a shared palette
+    - the last frame as an array for the fade, the end frame and the font
+    """
+    # NumPy is only needed by the image workers, not by the bot process
+    import numpy as np
+
+    rgb_frames, durations = [], []
+    with Image.open(PULL_GIF_PATH) as gif:
+        default_duration = gif.info.get("duration", DEFAULT_FRAME_DURATION)
+        for index in range(gif.n_frames):
+            gif.seek(index)
+            rgb_frames.append(gif.convert("RGB"))
+            durations.append(gif.info.get("duration", default_duration))
+
+    with Image.open(END_FRAME_PATH) as end_frame:
+        end_frame = end_frame.convert("RGB")
+    if end_frame.size != rgb_frames[0].size:
+        end_frame = end_frame.resize(rgb_frames[0].size, Image.LANCZOS)
+
+    palette = _build_palette([*rgb_frames[::PALETTE_SAMPLE_STEP], rgb_frames[-1], end_frame])
+    frames = tuple(frame.quantize(palette=palette) for frame in rgb_frames)
+    last_frame = np.asarray(rgb_frames[-1], dtype=np.float32)
+    last_frame.flags.writeable = False
+
+    return GachaAssets(frames, tuple(durations), palette, last_frame, end_frame, _load_font())
+
+
+def compose_end_frame(player_name: str, player_icon: Image.Image | None) -> Image.Image:
+    """Copy of the end frame with the player's avatar and name"""
+    assets = load_gacha_assets()
+    end_frame = assets.end_frame.copy()
+    width, height = end_frame.size
+
+    draw = ImageDraw.Draw(end_frame)
+    draw.text(NAME_POSITION, player_name, fill=(255, 255, 255), font=assets.font, anchor="mm")
+    if player_icon is not None:
+        player_icon = player_icon.convert("RGBA")
+        if player_icon.size != AVATAR_SIZE:
+            player_icon = player_icon.resize(AVATAR_SIZE, Image.LANCZOS)
+        position = (width // 2 - player_icon.width // 2, height // 2 - player_icon.height // 2)
+        end_frame.paste(player_icon, position, player_icon)
+    return end_frame
+
+
+def fade_frames(start: "np.ndarray", end: Image.Image, count: int = FADE_FRAMES) -> "np.ndarray":
+    """`count` steps of the fade from `start` to `end` (alpha 0 to (count - 1) / count), computed at once"""
+    import numpy as np
+
+    end = np.asarray(end, dtype=np.float32)
+    alphas = (np.arange(count, dtype=np.float32) / count)[:, None, None, None]
+    return (start + alphas * (end - start) + 0.5).astype(np.uint8)
+
+
+def render_pull_gif(player_name: str, avatar: bytes | None) -> bytes:
+    """
+    Encode the whole pull animation for one player and return the GIF bytes.
+    Only the end frame and the fade frames are computed, the base animation is reused as is.
+    Takes and returns bytes so that it can run in a worker process.
+    """
+    assets = load_gacha_assets()
+    player_icon = Image.open(BytesIO(avatar)) if avatar else None
+    end_frame = compose_end_frame(player_name, player_icon)
+
+    faded = [Image.fromarray(frame) for frame in fade_frames(assets.last_frame, end_frame)]
+    # The avatar brings colors the animation does not have: the fade frames share a
+    # palette of their own, computed once from the middle and the end of the fade
+    fade_palette = _build_palette([faded[len(faded) // 2], end_frame])
+    faded = [frame.quantize(palette=fade_palette) for frame in faded]
+    frames = [*assets.frames, *faded]
+    durations = [*assets.durations, *[assets.durations[-1]] * FADE_FRAMES]
+
+    buffer = BytesIO()
+    frames[0].save(
+        buffer,
+        format="GIF",
+        save_all=True,
+        append_images=frames[1:],
+        duration=durations,
+        # Play once: the frames carry the loop count of the source GIF, None drops it
+        loop=None,
+        optimize=False,
+    )
+    return buffer.getvalue()
@@ -0,0 +1,42 @@
+"""
+Shared asynchronous HTTP session for outbound API calls
+"""
+
+import aiohttp
+
+# Connection pool configuration
+REQUEST_TIMEOUT = 10  # seconds
+CONNECTION_LIMIT = 32
+CONNECTION_LIMIT_PER_HOST = 8
+KEEPALIVE_TIMEOUT = 60  # seconds
+DNS_CACHE_TTL = 300  # seconds
+
+_session: aiohttp.ClientSession | None = None
+
+
+def get_session() -> aiohttp.ClientSession:
+    """
+    Return the shared HTTP session, creating it on first use.
+    Must be called from inside the running event loop.
+    """
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=CONNECTION_LIMIT,
+            limit_per_host=CONNECTION_LIMIT_PER_HOST,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=DNS_CACHE_TTL,
+        )
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+        )
+    return _session
+
+
+async def close_session() -> None:
+    """Close the shared HTTP session and release its pooled connections"""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
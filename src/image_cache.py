@@ -0,0 +1,185 @@
+"""
+Shared cache of remote images (movie posters, Discord avatars, Riot player cards),
+also used for the web font files of the leaderboard
+"""
+
+import asyncio
+import hashlib
+import time
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from pathlib import Path
+
+import aiohttp
+
+from src.cache import DiskCache, PersistentCache
+from src.constants import DATA_DIR
+from src.display_helper import console, warning_style
+from src.executor import run_in_pool
+from src.http_client import get_session
+
+IMAGE_CACHE_DIR = DATA_DIR / "images"
+# Disk budgets, the least recently used files are deleted above them
+ORIGINALS_MAX_BYTES = 150 * 1024 * 1024
+VARIANTS_MAX_BYTES = 50 * 1024 * 1024
+# A cached image is used without contacting its server for this long,
+# then it is revalidated with its ETag / Last-Modified headers
+IMAGE_FRESHNESS = 24 * 60 * 60  # seconds
+# A failed download is not attempted again before this delay
+FAILED_DOWNLOAD_RETRY_DELAY = 600  # seconds
+
+# (width, height) of a resized variant, None follows the aspect ratio
+Size = tuple[int | None, int | None]
+
+
+def _url_key(url: str) -> str:
+    return hashlib.sha256(url.encode()).hexdigest()[:32]
+
+
+def resize_image(content: bytes, size: Size) -> bytes:
+    """Resize an encoded image to `size` and return it as PNG, runs in the image process pool"""
+    # Only imported by the workers, the bot process never decodes an image itself
+    from PIL import Image
+
+    try:
+        img = Image.open(BytesIO(content))
+    except Image.DecompressionBombError as e:
+        # Raised as a ValueError so the caller does not need Pillow to catch it
+        raise ValueError(str(e)) from None
+    width, height = size
+    if width is None and height is None:
+        raise ValueError("At least one dimension is needed to resize an image")
+    if width is None:
+        width = max(1, round(img.width * height / img.height))
+    elif height is None:
+        height = max(1, round(img.height * width / img.width))
+
+    # JPEG only: decode directly at a reduced scale
+    img.draft("RGB", (width, height))
+    img = img.convert("RGBA")
+    if img.size != (width, height):
+        img = img.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+
+    buffer = BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class ImageCache:
+    """
+    Images downloaded once and kept on disk, with resized variants.
+    - Originals are keyed by URL and revalidated with conditional requests
+      (If-None-Match / If-Modified-Since) once they are older than `freshness`
+    - Variants are keyed by the original content and the target size, so they
+      are recomputed only when the image itself changed
+    - A stale copy is still returned when the server cannot be reached
+    """
+
+    def __init__(self, directory: Path = IMAGE_CACHE_DIR, freshness: float = IMAGE_FRESHNESS):
+        self.freshness = freshness
+        self.originals = DiskCache(directory / "originals", ORIGINALS_MAX_BYTES, suffix=".img")
+        self.variants = DiskCache(directory / "variants", VARIANTS_MAX_BYTES, suffix=".png")
+        # Validators and content hash of every original, by URL key
+        self._index = PersistentCache(directory / "index.sqlite3")
+        self._in_flight: dict[str, asyncio.Future] = {}
+        self._failed: dict[str, float] = {}
+
+    async def _download(
+        self, url: str, key: str, cached: bytes | None, entry: dict | None, headers: dict | None
+    ) -> bytes | None:
+        headers = dict(headers or {})
+        if cached is not None and entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            async with get_session().get(url, headers=headers) as response:
+                if response.status == 304 and cached is not None:
+                    self._index.set("images", key, {**entry, "checked_at": time.time()}, ttl=None)
+                    return cached
+                response.raise_for_status()
+                content = await response.read()
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            console.print(f"Could not download image {url}: {type(e).__name__} {e}", style=warning_style)
+            if cached is None:
+                self._failed[url] = time.monotonic() + FAILED_DOWNLOAD_RETRY_DELAY
+            return cached
+
+        self.originals.set(key, content)
+        self._index.set(
+            "images",
+            key,
+            {
+                "etag": etag,
+                "last_modified": last_modified,
+                "checked_at": time.time(),
+                "digest": hashlib.sha256(content).hexdigest()[:32],
+            },
+            ttl=None,
+        )
+        return content
+
+    async def _fetch(self, url: str, headers: dict | None) -> bytes | None:
+        key = _url_key(url)
+        cached = self.originals.get(key)
+        entry = self._index.get("images", key)
+        if cached is not None and entry and time.time() - entry["checked_at"] < self.freshness:
+            return cached
+        if cached is None and time.monotonic() < self._failed.get(url, 0):
+            return None
+        return await self._download(url, key, cached, entry, headers)
+
+    async def get(self, url: str, headers: dict | None = None) -> bytes | None:
+        """
+        Return the original bytes of an image, None if it cannot be downloaded.
+        `headers` are added to the download request (e.g. a User-Agent).
+        """
+        # Concurrent requests for the same URL share a single download
+        future = self._in_flight.get(url)
+        if future is None:
+            future = asyncio.ensure_future(self._fetch(url, headers))
+            self._in_flight[url] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(url, None))
+        return await asyncio.shield(future)
+
+    async def get_path(self, url: str) -> Path | None:
+        """Same as `get`, but return the location of the cached file"""
+        if await self.get(url) is None:
+            return None
+        path = self.originals.path(_url_key(url))
+        return path if path.exists() else None
+
+    async def get_paths(self, urls: list[str]) -> dict[str, Path]:
+        """Fetch several images concurrently, the ones that failed are left out"""
+        unique_urls = list(dict.fromkeys(url for url in urls if url))
+        paths = await asyncio.gather(*(self.get_path(url) for url in unique_urls))
+        return {url: path for url, path in zip(unique_urls, paths) if path is not None}
+
+    async def get_resized(self, url: str, size: Size) -> bytes | None:
+        """Return the image resized to `size` as PNG, None if it cannot be downloaded or decoded"""
+        content = await self.get(url)
+        if content is None:
+            return None
+
+        entry = self._index.get("images", _url_key(url)) or {}
+        digest = entry.get("digest") or hashlib.sha256(content).hexdigest()[:32]
+        variant_key = f"{digest}_{size[0] or 'auto'}x{size[1] or 'auto'}"
+        variant = self.variants.get(variant_key)
+        if variant is not None:
+            return variant
+
+        try:
+            # CPU bound, kept off the event loop
+            variant = await run_in_pool(resize_image, content, size)
+        except (OSError, ValueError, asyncio.TimeoutError, BrokenProcessPool) as e:
+            console.print(f"Could not resize image {url}: {type(e).__name__} {e}", style=warning_style)
+            return None
+        self.variants.set(variant_key, variant)
+        return variant
+
+
+image_cache = ImageCache()
@@ -2,12 +2,21 @@
 IMDB API integration for movie information
 """
 
-import requests
+import aiohttp
 import asyncio
+import os
 from discord import Embed
 from rich.console import Console
 from pydantic import BaseModel
 from typing import Any
+from urllib.parse import urlsplit
+
+from src.cache import PersistentCache
+from src.circuit_breaker import CircuitBreaker, CircuitState
+from src.constants import DATA_DIR
+from src.http_client import get_session
+from src.metrics import outbound_timer
+from src.rate_limiter import parse_rate_limit, rate_limiter
 
 console = Console()
 
@@ -15,6 +24,27 @@ console = Console()
 MAX_RETRIES = 3
 RETRY_DELAY = 60  # seconds (will exponentially increase)
 RATE_LIMIT_STATUS_CODE = 429
+# How often a waiting retry checks whether the circuit breaker opened meanwhile
+BREAKER_POLL_INTERVAL = 1.0  # seconds
+
+IMDB_API_HOST = "api.imdbapi.dev"
+rate_limiter.configure(IMDB_API_HOST, *parse_rate_limit(os.getenv("IMDB_API_RATE_LIMIT", "5/1")))
+
+# Maximum number of title lookups in flight at the same time
+MAX_CONCURRENT_LOOKUPS = 4
+
+# Cache configuration
+SEARCH_CACHE_TTL = 7 * 24 * 3600  # seconds
+DETAILS_CACHE_TTL = 3 * 24 * 3600  # seconds
+NEGATIVE_CACHE_TTL = 3600  # seconds, for searches without any result
+CACHE_MAX_ENTRIES = 5000
+
+imdb_cache = PersistentCache(DATA_DIR / "imdb_cache.sqlite3", max_entries=CACHE_MAX_ENTRIES)
+
+# Opened by real request outcomes (timeouts, 429s, server errors), see src/circuit_breaker.py
+imdb_breaker = CircuitBreaker("imdb", recovery_timeout=120.0)
+# Returned as soon as the breaker is open, instead of waiting for a retry that would be rejected
+BREAKER_OPEN_ERROR = {"error": "IMDB API is unavailable (circuit breaker open)"}
 
 
 class Movie(BaseModel):
@@ -26,91 +56,175 @@ class Movie(BaseModel):
     rating: Any
 
 
+async def _wait_before_retry(wait_time: float) -> bool:
+    """
+    Sleep before a retry, giving up as soon as the circuit breaker opens
+    (a failure of a concurrent lookup can open it while this one waits).
+
+    :return: False if the breaker opened and the retry must not be sent
+    """
+    deadline = asyncio.get_running_loop().time() + wait_time
+    while not imdb_breaker.is_open:
+        remaining = deadline - asyncio.get_running_loop().time()
+        if remaining <= 0:
+            return True
+        await asyncio.sleep(min(remaining, BREAKER_POLL_INTERVAL))  # Non-blocking sleep
+    return False
+
+
 async def _make_request_with_retry(
     url: str, params: dict = None, max_retries: int = MAX_RETRIES
 ):
     """
     Make an HTTP GET request with automatic retry logic for rate limits.
-    Uses asyncio.sleep() instead of time.sleep() to avoid blocking the event loop.
+    Uses the shared aiohttp session and asyncio.sleep() so the event loop is never blocked.
 
     :param url: The URL to request
     :param params: Optional query parameters
     :param max_retries: Maximum number of retry attempts
     :return: Response JSON if successful, error dict otherwise
     """
+    session = get_session()
+    # "search" or "titles"
+    operation = urlsplit(url).path.split("/")[1]
     for attempt in range(max_retries):
-        try:
-            response = requests.get(
-                url, params=params, headers={"accept": "application/json"}, timeout=10
-            )
-
-            if response.status_code == 200:
-                return response.json()
-            elif response.status_code == RATE_LIMIT_STATUS_CODE:
-                # Rate limited - retry with exponential backoff
+        # Do not keep hammering an API that is known to be down. The slot is released
+        # even if this attempt is cancelled before it records an outcome
+        with imdb_breaker.request_slot() as allowed:
+            if not allowed:
+                console.print(f"IMDB circuit breaker is open, skipping request to {url}")
+                return dict(BREAKER_OPEN_ERROR)
+
+            # Wait for our turn instead of discovering the rate limit with a 429
+            await rate_limiter.acquire(url)
+            try:
+                with outbound_timer("imdb", operation) as timing:
+                    async with session.get(
+                        url, params=params, headers={"accept": "application/json"}
+                    ) as response:
+                        status_code = response.status
+                        retry_after = rate_limiter.update_from_headers(url, response.headers)
+                        payload = (
+                            await response.json(content_type=None)
+                            if status_code == 200
+                            else None
+                        )
+                    if status_code != 200:
+                        timing.outcome = "error"
+
+                if status_code == 200:
+                    imdb_breaker.record_success()
+                    return payload
+                elif status_code == RATE_LIMIT_STATUS_CODE:
+                    imdb_breaker.record_failure("rate limited")
+                    if imdb_breaker.is_open:
+                        return dict(BREAKER_OPEN_ERROR)
+                    # Rate limited - retry after the delay asked by the server, or with exponential backoff
+                    if attempt < max_retries - 1:
+                        wait_time = retry_after if retry_after is not None else RETRY_DELAY * (2**attempt)
+                        console.print(
+                            f"Rate limit hit. Waiting {wait_time}s before retry (attempt {attempt + 1}/{max_retries})"
+                        )
+                        # Pause the shared bucket so concurrent lookups wait as well
+                        rate_limiter.block(url, wait_time)
+                        if not await _wait_before_retry(wait_time):
+                            return dict(BREAKER_OPEN_ERROR)
+                        continue
+                    else:
+                        console.print(
+                            f"API rate limit exceeded after {max_retries} retries"
+                        )
+                        return {"error": "API rate limit exceeded after multiple retries"}
+                else:
+                    # A client error still means the API is up, only server errors count as failures
+                    if status_code >= 500:
+                        imdb_breaker.record_failure(f"status code {status_code}")
+                    else:
+                        imdb_breaker.record_success()
+                    console.print(
+                        f"API request failed with status code {status_code}"
+                    )
+                    return {
+                        "error": f"Request failed with status code {status_code}"
+                    }
+
+            except asyncio.TimeoutError:
+                imdb_breaker.record_failure("timeout")
+                if imdb_breaker.is_open:
+                    return dict(BREAKER_OPEN_ERROR)
                 if attempt < max_retries - 1:
                     wait_time = RETRY_DELAY * (2**attempt)
                     console.print(
-                        f"Rate limit hit. Waiting {wait_time}s before retry (attempt {attempt + 1}/{max_retries})"
+                        f"Request timeout. Waiting {wait_time}s before retry (attempt {attempt + 1}/{max_retries})"
                     )
-                    await asyncio.sleep(wait_time)  # Non-blocking sleep
+                    if not await _wait_before_retry(wait_time):
+                        return dict(BREAKER_OPEN_ERROR)
                     continue
                 else:
+                    console.print(f"Request timeout after {max_retries} retries")
+                    return {"error": "Request timeout after multiple retries"}
+
+            except (aiohttp.ClientError, ValueError) as e:
+                imdb_breaker.record_failure(str(e))
+                if imdb_breaker.is_open:
+                    return dict(BREAKER_OPEN_ERROR)
+                if attempt < max_retries - 1:
+                    wait_time = RETRY_DELAY * (2**attempt)
                     console.print(
-                        f"API rate limit exceeded after {max_retries} retries"
+                        f"Request error: {str(e)}. Waiting {wait_time}s before retry (attempt {attempt + 1}/{max_retries})"
                     )
-                    return {"error": "API rate limit exceeded after multiple retries"}
-            else:
-                console.print(
-                    f"API request failed with status code {response.status_code}"
-                )
-                return {
-                    "error": f"Request failed with status code {response.status_code}"
-                }
-
-        except requests.exceptions.Timeout:
-            if attempt < max_retries - 1:
-                wait_time = RETRY_DELAY * (2**attempt)
-                console.print(
-                    f"Request timeout. Waiting {wait_time}s before retry (attempt {attempt + 1}/{max_retries})"
-                )
-                await asyncio.sleep(wait_time)  # Non-blocking sleep
-                continue
-            else:
-                console.print(f"Request timeout after {max_retries} retries")
-                return {"error": "Request timeout after multiple retries"}
-
-        except requests.exceptions.RequestException as e:
-            if attempt < max_retries - 1:
-                wait_time = RETRY_DELAY * (2**attempt)
-                console.print(
-                    f"Request error: {str(e)}. Waiting {wait_time}s before retry (attempt {attempt + 1}/{max_retries})"
-                )
-                await asyncio.sleep(wait_time)  # Non-blocking sleep
-                continue
-            else:
-                console.print(f"Request failed after {max_retries} retries: {str(e)}")
-                return {"error": f"Request failed: {str(e)}"}
+                    if not await _wait_before_retry(wait_time):
+                        return dict(BREAKER_OPEN_ERROR)
+                    continue
+                else:
+                    console.print(f"Request failed after {max_retries} retries: {str(e)}")
+                    return {"error": f"Request failed: {str(e)}"}
 
     return {"error": "All retry attempts failed"}
 
 
+def _normalize_query(query: str) -> str:
+    """Normalize a search query so that equivalent queries share a cache entry"""
+    return " ".join(query.casefold().split())
+
+
 async def search_imdb_titles(query: str):
     """Search for movie titles on IMDB"""
+    cache_key = _normalize_query(query)
+    cached = imdb_cache.get("search", cache_key)
+    if cached is not None:
+        return cached
+
     url = "https://api.imdbapi.dev/search/titles"
     params = {"query": query, "limit": 1}
-    return await _make_request_with_retry(url, params)
+    response = await _make_request_with_retry(url, params)
+
+    # Errors are never cached, empty results only for a short time
+    if "error" not in response:
+        ttl = SEARCH_CACHE_TTL if response.get("titles") else NEGATIVE_CACHE_TTL
+        imdb_cache.set("search", cache_key, response, ttl)
+    return response
 
 
 async def get_imdb_title_details(title_id: str):
     """Get detailed information about a movie from IMDB"""
+    cached = imdb_cache.get("details", title_id)
+    if cached is not None:
+        return cached
+
     url = f"https://api.imdbapi.dev/titles/{title_id}"
-    return await _make_request_with_retry(url)
+    response = await _make_request_with_retry(url)
+
+    if "error" not in response:
+        imdb_cache.set("details", title_id, response, DETAILS_CACHE_TTL)
+    return response
 
 
 async def first_result_title_details(movie_title: str):
     """Get the first search result's details from IMDB"""
     search_results = await search_imdb_titles(movie_title)
+    if "error" in search_results:
+        return search_results
     if "titles" in search_results and len(search_results["titles"]) > 0:
         first_title_id = search_results["titles"][0]["id"]
         response = await get_imdb_title_details(first_title_id)
@@ -133,6 +247,39 @@ async def first_result_title_details(movie_title: str):
         return {"error": "No titles found for the given query."}
 
 
+async def fetch_titles_details(
+    movie_titles: list[str], max_concurrency: int = MAX_CONCURRENT_LOOKUPS
+) -> list[Movie | dict]:
+    """
+    Resolve several movie titles concurrently, keeping the input order.
+    A failed lookup yields an error dict for that title without cancelling the others.
+
+    :param movie_titles: The titles to look up
+    :param max_concurrency: Maximum number of lookups in flight at once
+    :return: One Movie or error dict per title, in the same order as `movie_titles`
+    """
+    # While half-open the breaker lets a single probe through: resolve titles one by one
+    if imdb_breaker.state is not CircuitState.CLOSED:
+        max_concurrency = 1
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _lookup(movie_title: str) -> Movie | dict:
+        async with semaphore:
+            # The breaker may have opened while this lookup was queued
+            if imdb_breaker.is_open:
+                return dict(BREAKER_OPEN_ERROR)
+            try:
+                movie_info = await first_result_title_details(movie_title)
+            except Exception as e:
+                console.print(f"Lookup failed for '{movie_title}': {e}")
+                return {"error": str(e)}
+        if movie_info is None:
+            return {"error": "Failed to retrieve title details"}
+        return movie_info
+
+    return await asyncio.gather(*(_lookup(title) for title in movie_titles))
+
+
 def prepare_message(movie: Movie):
     """Prepare a Discord message with movie information"""
     genres = movie.genres
@@ -175,6 +322,9 @@ def prepare_message(movie: Movie):
 async def test_imdb_api() -> tuple[bool, str | None]:
     """Test if the IMDB API search endpoint is reachable.
 
+    Only meant for manual diagnostics: commands rely on `imdb_breaker` instead
+    of probing the API before every lookup.
+
     Returns a tuple `(ok, error_message)` where `ok` is True if the API responded
     successfully and `error_message` contains details on failure when `ok` is False.
     """
@@ -196,19 +346,22 @@ def fetch_info_via_wikipedia(movie_title: str) -> Movie | None:
     import wikipediaapi
 
     wiki = wikipediaapi.Wikipedia(user_agent='MovieNightBot', language='en')
-    page = wiki.page(movie_title)
-
-    if not page.exists():
-        console.print(f"[red]Wikipedia page not found for: {movie_title}[/red]")
-        return None
-    
-    # Extract information from the Wikipedia page
-    plot = page.summary if page.summary else "N/A"
+    # The page is loaded lazily, by the attributes read below
+    with outbound_timer("wikipedia", "page") as timing:
+        page = wiki.page(movie_title)
+
+        if not page.exists():
+            timing.outcome = "not_found"
+            console.print(f"[red]Wikipedia page not found for: {movie_title}[/red]")
+            return None
+
+        # Extract information from the Wikipedia page
+        plot = page.summary if page.summary else "N/A"
+        image_url = page.images[0].url if page.images else ""
+
     genres = []  # Wikipedia may not have structured genre info; this can be improved with
     # additional parsing or using infoboxes if available.
 
-    image_url = page.images[0].url if page.images else ""
-
     return Movie(
         id=page.title,
         primaryTitle=page.title,
@@ -0,0 +1,96 @@
+"""
+Startup import time of the bot entry points, checked against a budget.
+
+Each module is imported in a fresh interpreter with `python -X importtime` and
+the best time of a few runs is kept, so the check is not thrown off by a cold disk cache.
+
+    python -m src.import_budget                    # every entry point of IMPORT_BUDGETS_MS
+    python -m src.import_budget main --budget-ms 500
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+# Maximum cumulative import time of each entry point, discord.py alone takes ~250 ms
+IMPORT_BUDGETS_MS = {
+    "main": 450,
+    "launch_bot": 400,
+}
+RUNS = 3
+
+_LINE_PATTERN = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure_import_time(module: str) -> list[tuple[str, int, int]]:
+    """
+    Import `module` in a new interpreter and return (name, depth, cumulative µs)
+    for every module it loaded, depth 0 being `module` itself.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+
+    # -X importtime lists a module after its dependencies: everything between the
+    # previous top-level import and the one of `module` belongs to it
+    entries: list[tuple[str, int, int]] = []
+    for line in result.stderr.splitlines():
+        match = _LINE_PATTERN.match(line)
+        if match is None:
+            continue
+        _, cumulative, indent, name = match.groups()
+        depth = (len(indent) - 1) // 2
+        if depth == 0 and name != module:
+            entries.clear()
+            continue
+        entries.append((name, depth, int(cumulative)))
+    return entries
+
+
+def check_import_budget(module: str, budget_ms: float, top: int = 10) -> bool:
+    """Print the import time of `module` and its heaviest direct imports, True if within budget"""
+    runs = [measure_import_time(module) for _ in range(RUNS)]
+    entries = min(runs, key=lambda run: run[-1][2])
+    total_ms = entries[-1][2] / 1000
+
+    within_budget = total_ms <= budget_ms
+    status = "OK" if within_budget else "OVER BUDGET"
+    print(f"{module}: {total_ms:.0f} ms (budget {budget_ms:.0f} ms) {status}")
+    direct_imports = sorted((entry for entry in entries if entry[1] == 1), key=lambda entry: -entry[2])
+    for name, _, cumulative in direct_imports[:top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+    return within_budget
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=list(IMPORT_BUDGETS_MS), help="Modules to check")
+    parser.add_argument("--budget-ms", type=float, help="Budget overriding IMPORT_BUDGETS_MS")
+    parser.add_argument("--top", type=int, default=10, help="Number of heaviest imports listed")
+    args = parser.parse_args()
+
+    success = True
+    for module in args.modules:
+        budget_ms = args.budget_ms or IMPORT_BUDGETS_MS.get(module)
+        if budget_ms is None:
+            parser.error(f"No budget for {module}, use --budget-ms")
+        try:
+            success &= check_import_budget(module, budget_ms, args.top)
+        except RuntimeError as e:
+            print(e)
+            success = False
+    return 0 if success else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Valorant leaderboard data collection and pre-rendering
+"""
+
+import asyncio
+from datetime import datetime, timezone
+from pathlib import Path
+
+import discord
+from pydantic import BaseModel
+
+from schemas import LeaderboardPlayer
+from src.constants import LEADERBOARD_ACT, PLAYERS_VALORANT_MAPPING
+from src.display_helper import console, error_style, success_style, warning_style
+from src.members import member_directory
+from src.renderer import render_leaderboard
+from src.valorant import CachedRiotAPIClient
+
+# Maximum number of players fetched at the same time
+MAX_CONCURRENT_PLAYERS = 5
+# A player slower than the Riot client's longest request (retries included) plus this
+# allowance for the rate limiter is left out instead of delaying the whole leaderboard
+RATE_LIMIT_ALLOWANCE = 30  # seconds
+
+
+async def _fetch_player(
+    riot_client: CachedRiotAPIClient,
+    player: dict,
+    semaphore: asyncio.Semaphore,
+    force_refresh: bool = False,
+) -> dict | None:
+    """
+    Fetch the rank and the account card of one player concurrently.
+    The timeout starts once the semaphore is acquired, waiting for a slot does not count.
+    """
+    timeout = riot_client.client.max_request_duration + RATE_LIMIT_ALLOWANCE
+    async with semaphore:
+        try:
+            rank_result, account_result = await asyncio.wait_for(
+                asyncio.gather(
+                    riot_client.get_rank_carrier(
+                        player["name"], "eu", player["tag"], "pc", force_refresh=force_refresh
+                    ),
+                    riot_client.get_player_info(
+                        player["name"], player["tag"], force_refresh=force_refresh
+                    ),
+                    return_exceptions=True,
+                ),
+                timeout,
+            )
+        except asyncio.TimeoutError:
+            console.print(f"Timed out fetching data for {player['name']} after {timeout:.0f}s", style=error_style)
+            return None
+
+    if isinstance(rank_result, BaseException):
+        console.print(f"Error fetching data for {player['name']}: {rank_result}", style=error_style)
+        return None
+
+    player_info = rank_result.get("data", {})
+    console.print(f"Fetched data for {player['name']}: {player_info}")
+    nb_games = sum(season.get("games", 0) for season in player_info.get("seasonal", []))
+    nb_win = sum(season.get("wins", 0) for season in player_info.get("seasonal", []))
+
+    if isinstance(account_result, BaseException):
+        console.print(f"Error fetching card for {player['name']}: {account_result}", style=warning_style)
+        card = None
+    else:
+        card = account_result.get("card", {}).get("large", None)
+
+    return {
+        "name": player_info.get("account", {}).get("name", player["name"]),
+        "rank": player_info.get("current", {}).get("tier", {}).get("name", "N/A"),
+        "rr": player_info.get("current", {}).get("rr") or 0,
+        "winrate": (nb_win / nb_games * 100) if nb_games > 0 else 0,
+        "games": nb_games,
+        "rank_id": player_info.get("current", {}).get("tier", {}).get("id") or 0,
+        "discord_id": player["discord_id"],
+        "tag": player["tag"],
+        "card": card,
+    }
+
+
+async def collect_leaderboard_players(
+    riot_client: CachedRiotAPIClient,
+    guild: discord.Guild | None,
+    players_mapping: list[dict] = PLAYERS_VALORANT_MAPPING,
+    max_concurrency: int = MAX_CONCURRENT_PLAYERS,
+    force_refresh: bool = False,
+) -> list[LeaderboardPlayer]:
+    """
+    Fetch every player of the mapping concurrently and return them sorted by rank.
+    A player whose data cannot be fetched is skipped without affecting the others.
+    `force_refresh` bypasses the Riot cache.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    results = await asyncio.gather(
+        *(_fetch_player(riot_client, player, semaphore, force_refresh) for player in players_mapping)
+    )
+    players = [player for player in results if player is not None]
+    players.sort(key=lambda x: (x["rank_id"], x["rr"]), reverse=True)
+
+    # Get the players' discord member objects, in one batch when they are not cached
+    members = await member_directory.get_members(guild, [player["discord_id"] for player in players]) if guild else {}
+    for player in players:
+        member = members.get(player["discord_id"])
+        player["avatar"] = str(member.display_avatar.url) if member else None
+
+    return [LeaderboardPlayer(**player) for player in players]
+
+
+class LeaderboardSnapshot(BaseModel):
+    guild_id: int
+    image: bytes
+    generated_at: datetime
+
+
+# Latest rendered leaderboard of each guild
+_latest_snapshots: dict[int, LeaderboardSnapshot] = {}
+
+
+def get_latest_snapshot(guild_id: int) -> LeaderboardSnapshot | None:
+    """Return the last leaderboard rendered for a guild, if any"""
+    return _latest_snapshots.get(guild_id)
+
+
+async def refresh_leaderboard(
+    riot_client: CachedRiotAPIClient,
+    guild: discord.Guild,
+    force_refresh: bool = False,
+) -> LeaderboardSnapshot:
+    """
+    Run the whole leaderboard pipeline for a guild and keep the result as its latest snapshot.
+    - Fetch player data from Riot API
+    - Render the leaderboard image, unless an identical one is in the render cache
+    """
+    leaderboard_players = await collect_leaderboard_players(
+        riot_client, guild, force_refresh=force_refresh
+    )
+    if not leaderboard_players:
+        raise ValueError("No player data could be fetched from the Riot API")
+
+    templates_path = Path("templates")
+    # Rendered in memory, or reused as is when no input changed since the last render
+    image = await render_leaderboard(templates_path, leaderboard_players, LEADERBOARD_ACT)
+
+    snapshot = LeaderboardSnapshot(
+        guild_id=guild.id, image=image, generated_at=datetime.now(timezone.utc)
+    )
+    _latest_snapshots[guild.id] = snapshot
+    console.print(f"Leaderboard refreshed for guild {guild.name}", style=success_style)
+    return snapshot
@@ -0,0 +1,211 @@
+"""
+Guild member lookups, with or without discord.py's member cache
+"""
+
+import asyncio
+import os
+from collections import defaultdict
+from typing import Iterable
+
+import discord
+
+from src.cache import TTLCache
+from src.display_helper import console, warning_style
+
+# "lean" keeps no member cache: members are fetched on demand and kept in a bounded cache.
+# "full" caches every member of every guild at startup (Intents.all()).
+MEMBER_CACHE_MODE = os.getenv("PYBOT_MEMBER_CACHE", "lean").lower()
+LEAN_MEMBER_CACHE = MEMBER_CACHE_MODE != "full"
+
+# Bounded cache of the members fetched in lean mode
+MEMBER_CACHE_MAX_ENTRIES = 2000
+MEMBER_CACHE_TTL = 10 * 60  # seconds
+# How long the members of a role are reused before being fetched again
+ROLE_MEMBERS_TTL = 5 * 60  # seconds
+ROLE_CACHE_MAX_ENTRIES = 64
+# Discord has no "members of a role" endpoint: a role lookup pages through the member
+# list (1000 per request). It stops after this many members, 10 requests at most
+ROLE_SCAN_MAX_MEMBERS = 10_000
+# Maximum number of user IDs per member query allowed by the gateway
+QUERY_MEMBERS_BATCH = 100
+
+
+def bot_options(lean: bool = LEAN_MEMBER_CACHE) -> dict:
+    """Intents and member cache options of the bot for the chosen mode"""
+    if not lean:
+        return {"intents": discord.Intents.all()}
+
+    # The commands only need the guilds and the member list, fetched on demand
+    intents = discord.Intents.default()
+    intents.members = True
+    return {
+        "intents": intents,
+        "member_cache_flags": discord.MemberCacheFlags.none(),
+        "chunk_guilds_at_startup": False,
+    }
+
+
+class RoleIndex:
+    """
+    Member IDs of every role, per guild, so that resolving a role mention does not
+    scan every member. A guild is indexed on first use, then kept up to date from the
+    member and role gateway events (see the handlers in main.py).
+    """
+
+    def __init__(self):
+        self._guilds: dict[int, dict[int, set[int]]] = {}
+
+    def _index(self, guild: discord.Guild) -> dict[int, set[int]]:
+        index = self._guilds.get(guild.id)
+        if index is None:
+            index = defaultdict(set)
+            for member in guild.members:
+                for role in member.roles:
+                    index[role.id].add(member.id)
+            self._guilds[guild.id] = index
+        return index
+
+    def members(self, guild: discord.Guild, role_id: int) -> set[int]:
+        """IDs of the members having a role"""
+        if role_id == guild.id:
+            # @everyone
+            return {member.id for member in guild.members}
+        return set(self._index(guild).get(role_id, ()))
+
+    def add_member(self, member: discord.Member) -> None:
+        index = self._guilds.get(member.guild.id)
+        if index is not None:
+            for role in member.roles:
+                index[role.id].add(member.id)
+
+    def remove_member(self, member: discord.Member) -> None:
+        index = self._guilds.get(member.guild.id)
+        if index is not None:
+            for member_ids in index.values():
+                member_ids.discard(member.id)
+
+    def update_member(self, before: discord.Member, after: discord.Member) -> None:
+        index = self._guilds.get(after.guild.id)
+        if index is not None:
+            before_roles = {role.id for role in before.roles}
+            after_roles = {role.id for role in after.roles}
+            for role_id in before_roles - after_roles:
+                index[role_id].discard(after.id)
+            for role_id in after_roles - before_roles:
+                index[role_id].add(after.id)
+
+    def remove_role(self, role: discord.Role) -> None:
+        index = self._guilds.get(role.guild.id)
+        if index is not None:
+            index.pop(role.id, None)
+
+    def forget_guild(self, guild_id: int) -> None:
+        self._guilds.pop(guild_id, None)
+
+
+role_index = RoleIndex()
+
+
+class MemberDirectory:
+    """
+    Member and role lookups working in both member cache modes.
+    - full: everything is answered from discord.py's cache and the role index
+    - lean: members are queried by ID in batches over the gateway and role members
+      are found by paging through the member list (see ROLE_SCAN_MAX_MEMBERS). Only
+      member IDs of the requested roles are kept, in bounded TTL caches
+    """
+
+    def __init__(self, lean: bool = LEAN_MEMBER_CACHE):
+        self.lean = lean
+        self._members = TTLCache(max_entries=MEMBER_CACHE_MAX_ENTRIES, namespace="members")
+        # Member IDs of the roles looked up recently, by "guild:role"
+        self._roles = TTLCache(max_entries=ROLE_CACHE_MAX_ENTRIES, namespace="role_members")
+        self._role_locks: dict[int, asyncio.Lock] = {}
+
+    async def get_members(self, guild: discord.Guild, member_ids: Iterable[int]) -> dict[int, discord.Member]:
+        """Members of the guild among `member_ids`, unknown IDs are left out"""
+        found: dict[int, discord.Member] = {}
+        missing: list[int] = []
+        for member_id in dict.fromkeys(member_ids):
+            member = guild.get_member(member_id) or self._members.get(f"{guild.id}:{member_id}")
+            if member is not None:
+                found[member_id] = member
+            else:
+                missing.append(member_id)
+
+        if not self.lean or not missing:
+            return found
+
+        for start in range(0, len(missing), QUERY_MEMBERS_BATCH):
+            batch = missing[start:start + QUERY_MEMBERS_BATCH]
+            try:
+                members = await guild.query_members(user_ids=batch, limit=len(batch), cache=False)
+            except asyncio.TimeoutError:
+                console.print(f"Member query timed out in guild {guild.name}")
+                continue
+            for member in members:
+                self._members.set(f"{guild.id}:{member.id}", member, MEMBER_CACHE_TTL)
+                found[member.id] = member
+        return found
+
+    async def get_member(self, guild: discord.Guild, member_id: int) -> discord.Member | None:
+        return (await self.get_members(guild, [member_id])).get(member_id)
+
+    async def _scan_roles(self, guild: discord.Guild, role_ids: set[int]) -> dict[int, frozenset[int]]:
+        """
+        Page through the member list once and keep the members of `role_ids` only.
+        Costs one REST request per 1000 members, up to ROLE_SCAN_MAX_MEMBERS.
+        """
+        found: dict[int, set[int]] = {role_id: set() for role_id in role_ids}
+        scanned = 0
+        # member.roles includes @everyone, whose ID is the guild ID
+        async for member in guild.fetch_members(limit=ROLE_SCAN_MAX_MEMBERS):
+            scanned += 1
+            for role in member.roles:
+                if role.id in found:
+                    found[role.id].add(member.id)
+        if scanned >= ROLE_SCAN_MAX_MEMBERS:
+            console.print(
+                f"Stopped the role lookup of {guild.name} after {scanned} members, roles may be incomplete",
+                style=warning_style,
+            )
+        return {role_id: frozenset(member_ids) for role_id, member_ids in found.items()}
+
+    async def roles_members(self, guild: discord.Guild, role_ids: Iterable[int]) -> dict[int, set[int]]:
+        """IDs of the members of each role (the guild ID is @everyone), with a single scan in lean mode"""
+        role_ids = set(role_ids)
+        if not self.lean:
+            return {role_id: role_index.members(guild, role_id) for role_id in role_ids}
+
+        def cached() -> dict[int, frozenset[int]]:
+            results = {}
+            for role_id in role_ids:
+                member_ids = self._roles.get(f"{guild.id}:{role_id}")
+                if member_ids is not None:
+                    results[role_id] = member_ids
+            return results
+
+        results = cached()
+        if len(results) < len(role_ids):
+            lock = self._role_locks.setdefault(guild.id, asyncio.Lock())
+            async with lock:
+                # Another caller may have fetched some of them while this one was waiting
+                results = cached()
+                missing = role_ids - results.keys()
+                if missing:
+                    for role_id, member_ids in (await self._scan_roles(guild, missing)).items():
+                        self._roles.set(f"{guild.id}:{role_id}", member_ids, ROLE_MEMBERS_TTL)
+                        results[role_id] = member_ids
+        return {role_id: set(member_ids) for role_id, member_ids in results.items()}
+
+    async def role_members(self, guild: discord.Guild, role_id: int) -> set[int]:
+        """IDs of the members having a role (the guild ID is @everyone)"""
+        return (await self.roles_members(guild, [role_id]))[role_id]
+
+    def forget_guild(self, guild_id: int) -> None:
+        role_index.forget_guild(guild_id)
+        # The cached roles of the guild expire on their own, after ROLE_MEMBERS_TTL
+        self._role_locks.pop(guild_id, None)
+
+
+member_directory = MemberDirectory()
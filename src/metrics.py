@@ -0,0 +1,298 @@
+"""
+Latency, error and cache metrics of the bot.
+
+Everything is kept in memory by the `metrics` registry and can be read three ways:
+- a Prometheus text endpoint (GET /metrics), when METRICS_PORT is set
+- a JSON summary written to the console every METRICS_LOG_MINUTES
+- the owner-only /bot_stats command
+"""
+
+import asyncio
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Iterator
+
+from src.display_helper import console, success_style
+
+if TYPE_CHECKING:
+    import discord
+    from aiohttp import web
+
+# Prometheus endpoint, disabled when the port is 0
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+# Interval of the JSON summary written to the console, disabled when 0
+METRICS_LOG_MINUTES = float(os.getenv("METRICS_LOG_MINUTES", "0"))
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+COMMAND_SECONDS = "pybot_command_duration_seconds"
+COMMAND_ERRORS = "pybot_command_errors_total"
+OUTBOUND_SECONDS = "pybot_outbound_request_duration_seconds"
+CACHE_REQUESTS = "pybot_cache_requests_total"
+METRIC_HELP = {
+    COMMAND_SECONDS: "Time from the interaction creation to the end of the app command",
+    COMMAND_ERRORS: "App commands that raised, by exception type",
+    OUTBOUND_SECONDS: "Duration of the calls to external services and of the image jobs",
+    CACHE_REQUESTS: "Cache lookups by cache, tier and result",
+}
+
+# (name, value) pairs in the order given by the caller, usable as a dict key
+Labels = tuple[tuple[str, str], ...]
+
+
+class Histogram:
+    """Observations counted in buckets, enough to estimate quantiles without keeping them"""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        # One count per bucket, the last one for the values above every bound
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other: "Histogram") -> None:
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.sum += other.sum
+        self.count += other.count
+
+    def quantile(self, q: float) -> float:
+        """Estimated `q` quantile, interpolated inside its bucket like Prometheus' histogram_quantile"""
+        if self.count == 0:
+            return math.nan
+        rank = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            if count and cumulative + count >= rank:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+
+class Timing:
+    """Handle of a running timer, `outcome` can be changed when a call failed without raising"""
+
+    def __init__(self):
+        self.outcome = "ok"
+
+
+class Metrics:
+    """
+    Thread-safe registry of counters and latency histograms, identified by
+    a metric name and a set of labels (command, service, cache...).
+    Labels must stay low-cardinality: names of commands or endpoints, never ids.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[Labels, float]] = defaultdict(dict)
+        self._histograms: dict[str, dict[Labels, Histogram]] = defaultdict(dict)
+        self.started_at = time.time()
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        key = tuple(labels.items())
+        with self._lock:
+            counters = self._counters[name]
+            counters[key] = counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = tuple(labels.items())
+        with self._lock:
+            histogram = self._histograms[name].get(key)
+            if histogram is None:
+                histogram = self._histograms[name][key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels: str) -> Iterator[Timing]:
+        """
+        Observe the duration of the block with an `outcome` label:
+        "error" if it raised, "cancelled" if its task was cancelled, `Timing.outcome` otherwise
+        """
+        timing = Timing()
+        start = time.perf_counter()
+        try:
+            yield timing
+        except asyncio.CancelledError:
+            timing.outcome = "cancelled"
+            raise
+        except Exception:
+            timing.outcome = "error"
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels, outcome=timing.outcome)
+
+    def render_prometheus(self) -> str:
+        """Every metric in the Prometheus text exposition format"""
+        lines = [
+            "# HELP pybot_uptime_seconds Time since the bot process started",
+            "# TYPE pybot_uptime_seconds gauge",
+            f"pybot_uptime_seconds {time.time() - self.started_at:.3f}",
+        ]
+        with self._lock:
+            for name, counters in sorted(self._counters.items()):
+                lines += [f"# HELP {name} {METRIC_HELP.get(name, name)}", f"# TYPE {name} counter"]
+                for labels, value in sorted(counters.items()):
+                    lines.append(f"{name}{_format_labels(labels)} {value:g}")
+            for name, histograms in sorted(self._histograms.items()):
+                lines += [f"# HELP {name} {METRIC_HELP.get(name, name)}", f"# TYPE {name} histogram"]
+                for labels, histogram in sorted(histograms.items()):
+                    cumulative = 0
+                    for bound, count in zip((*histogram.buckets, math.inf), histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == math.inf else f"{bound:g}"
+                        lines.append(f"{name}_bucket{_format_labels((*labels, ('le', le)))} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum:.6f}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def latency_summary(self, name: str) -> dict[str, dict]:
+        """
+        Calls, errors and estimated p50 / p95 / p99 in ms of a histogram metric, by label set.
+        The outcome label is folded into the error count.
+        """
+        merged: dict[str, Histogram] = {}
+        errors: dict[str, int] = defaultdict(int)
+        with self._lock:
+            for labels, histogram in self._histograms.get(name, {}).items():
+                key = "/".join(value for label, value in labels if label != "outcome")
+                merged.setdefault(key, Histogram(histogram.buckets)).merge(histogram)
+                if dict(labels).get("outcome", "ok") != "ok":
+                    errors[key] += histogram.count
+
+        return {
+            key: {
+                "calls": histogram.count,
+                "errors": errors[key],
+                "p50_ms": round(histogram.quantile(0.50) * 1000, 1),
+                "p95_ms": round(histogram.quantile(0.95) * 1000, 1),
+                "p99_ms": round(histogram.quantile(0.99) * 1000, 1),
+            }
+            for key, histogram in sorted(merged.items())
+        }
+
+    def cache_summary(self) -> dict[str, dict]:
+        """Hits, misses and hit rate of every cache tier"""
+        results: dict[str, dict] = defaultdict(lambda: {"hit": 0, "miss": 0})
+        with self._lock:
+            for labels, value in self._counters.get(CACHE_REQUESTS, {}).items():
+                labels = dict(labels)
+                results[f"{labels['cache']}/{labels['tier']}"][labels["result"]] += int(value)
+        return {
+            key: {**counts, "hit_rate": round(counts["hit"] / (counts["hit"] + counts["miss"]), 3)}
+            for key, counts in sorted(results.items())
+        }
+
+    def snapshot(self) -> dict:
+        """Summary of every metric, as logged and shown by /bot_stats"""
+        return {
+            "uptime_s": round(time.time() - self.started_at),
+            "commands": self.latency_summary(COMMAND_SECONDS),
+            "outbound": self.latency_summary(OUTBOUND_SECONDS),
+            "caches": self.cache_summary(),
+        }
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (label, str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"))
+        for label, value in labels
+    )
+    return "{" + ",".join(f'{label}="{value}"' for label, value in escaped) + "}"
+
+
+metrics = Metrics()
+
+
+def outbound_timer(service: str, operation: str):
+    """Timer of a call to an external service (IMDB, Riot, Discord...) or of an image job"""
+    return metrics.timer(OUTBOUND_SECONDS, service=service, operation=operation)
+
+
+def record_cache(cache: str, tier: str, hit: bool) -> None:
+    """Count a lookup in the `tier` (memory, sqlite, disk) of a cache"""
+    metrics.inc(CACHE_REQUESTS, cache=cache, tier=tier, result="hit" if hit else "miss")
+
+
+def record_command(interaction: "discord.Interaction", error: BaseException | None = None) -> None:
+    """
+    Observe an app command from the user's click (interaction creation) to the end of its callback,
+    called by the on_app_command_completion event and the command tree error handler
+    """
+    command = interaction.command.qualified_name if interaction.command else "unknown"
+    elapsed = (datetime.now(timezone.utc) - interaction.created_at).total_seconds()
+    metrics.observe(COMMAND_SECONDS, elapsed, command=command, outcome="ok" if error is None else "error")
+    if error is not None:
+        # CommandInvokeError wraps the exception raised by the callback
+        error = getattr(error, "original", error)
+        metrics.inc(COMMAND_ERRORS, command=command, error=type(error).__name__)
+
+
+def log_metrics() -> None:
+    """Write the metrics summary to the console as a single JSON line"""
+    console.print(
+        json.dumps({"event": "metrics", **metrics.snapshot()}, separators=(",", ":")),
+        soft_wrap=True,
+        highlight=False,
+        markup=False,
+    )
+
+
+_runner: "web.AppRunner | None" = None
+_log_task: asyncio.Task | None = None
+
+
+async def _log_periodically(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        log_metrics()
+
+
+async def start_metrics_export(port: int = METRICS_PORT, log_minutes: float = METRICS_LOG_MINUTES) -> None:
+    """Start the Prometheus endpoint and the periodic summary log, each one only if configured"""
+    global _runner, _log_task
+    if port and _runner is None:
+        from aiohttp import web
+
+        async def handle_metrics(request: web.Request) -> web.Response:
+            return web.Response(
+                body=metrics.render_prometheus().encode(),
+                headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+            )
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle_metrics)
+        _runner = web.AppRunner(app, access_log=None)
+        await _runner.setup()
+        await web.TCPSite(_runner, METRICS_HOST, port).start()
+        console.print(f"Metrics served on http://{METRICS_HOST}:{port}/metrics", style=success_style)
+
+    if log_minutes > 0 and _log_task is None:
+        _log_task = asyncio.create_task(_log_periodically(log_minutes * 60))
+
+
+async def stop_metrics_export() -> None:
+    global _runner, _log_task
+    if _log_task is not None:
+        _log_task.cancel()
+        _log_task = None
+    if _runner is not None:
+        await _runner.cleanup()
+        _runner = None
@@ -0,0 +1,245 @@
+"""
+Browser-free leaderboard renderer drawing the layout of templates/leaderboard.html with Pillow
+"""
+
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+from schemas import LeaderboardPlayer
+from src.fonts import load_text_font
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+VALORANT_FONT_PATH = PROJECT_ROOT / "static" / "Valorant Font.ttf"
+LOGO_PATH = PROJECT_ROOT / "assets" / "V_Lockup_Horizontal_Neg_Red.png"
+
+# Layout values taken from static/style.css
+WIDTH = 1000
+MIN_HEIGHT = 1400
+PADDING = 40
+BACKGROUND = (26, 26, 30)
+CARD_FILL = (255, 255, 255, 13)
+GREY = (156, 163, 175)
+DARK_GREY = (107, 114, 128)
+WHITE = (255, 255, 255)
+PODIUM_GAP = 32
+PODIUM_HEIGHTS = {1: 320, 2: 260, 3: 240}
+LIST_GAP = 24
+LIST_CARD_HEIGHT = 74
+MAX_LIST_PLAYERS = 9
+
+
+@lru_cache(maxsize=32)
+def _valorant_font(size: int) -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype(VALORANT_FONT_PATH, size)
+
+
+@lru_cache(maxsize=32)
+def _text_font(size: int) -> ImageFont.FreeTypeFont:
+    return load_text_font(size)
+
+
+@lru_cache(maxsize=1)
+def _logo() -> Image.Image:
+    logo = Image.open(LOGO_PATH).convert("RGBA")
+    logo = logo.resize((round(logo.width * 170 / logo.height), 170), Image.LANCZOS)
+    # opacity: 0.9
+    logo.putalpha(logo.getchannel("A").point(lambda value: int(value * 0.9)))
+    return logo
+
+
+@lru_cache(maxsize=4)
+def _podium_gradient(size: tuple[int, int]) -> Image.Image:
+    """linear-gradient(to top, #0f1115 20%, rgba(15,17,21,0.7) 50%, transparent 100%)"""
+    width, height = size
+    column = Image.new("L", (1, height))
+    for y in range(height):
+        from_bottom = 1 - y / height
+        if from_bottom <= 0.2:
+            alpha = 1.0
+        elif from_bottom <= 0.5:
+            alpha = 1.0 - 0.3 * (from_bottom - 0.2) / 0.3
+        else:
+            alpha = 0.7 * (1 - (from_bottom - 0.5) / 0.5)
+        column.putpixel((0, y), int(alpha * 255))
+    gradient = Image.new("RGBA", size, (15, 17, 21, 0))
+    gradient.putalpha(column.resize(size))
+    return gradient
+
+
+def _load_image(path: Path | None) -> Image.Image | None:
+    if path is None:
+        return None
+    try:
+        return Image.open(path).convert("RGBA")
+    except (OSError, ValueError):
+        return None
+
+
+def _rounded(image: Image.Image, radius: int) -> Image.Image:
+    mask = Image.new("L", image.size, 0)
+    ImageDraw.Draw(mask).rounded_rectangle((0, 0, image.width - 1, image.height - 1), radius, fill=255)
+    mask = Image.composite(image.getchannel("A"), mask, mask)
+    rounded = image.copy()
+    rounded.putalpha(mask)
+    return rounded
+
+
+def _fit_text(draw: ImageDraw.ImageDraw, text: str, font, max_width: int) -> str:
+    if draw.textlength(text, font=font) <= max_width:
+        return text
+    while text and draw.textlength(text + "…", font=font) > max_width:
+        text = text[:-1]
+    return text + "…"
+
+
+def _draw_rank(draw: ImageDraw.ImageDraw, position: tuple[int, int], rank: int, size: int, fill, anchor: str) -> None:
+    """`#<rank>`: the Valorant font has no '#' glyph, it falls back to the text font like in the browser"""
+    hash_font, number_font = _text_font(size), _valorant_font(size)
+    hash_width = draw.textlength("#", font=hash_font)
+    total_width = hash_width + draw.textlength(str(rank), font=number_font)
+    x, y = position
+    if anchor[0] == "m":
+        x -= total_width / 2
+    draw.text((x, y), "#", font=hash_font, fill=fill, anchor="l" + anchor[1])
+    draw.text((x + hash_width, y), str(rank), font=number_font, fill=fill, anchor="l" + anchor[1])
+
+
+def _draw_podium_card(
+    canvas: Image.Image, box: tuple[int, int, int, int], player: LeaderboardPlayer, images: dict[str, Path]
+) -> None:
+    left, top, right, bottom = box
+    size = (right - left, bottom - top)
+    card = Image.new("RGBA", size, CARD_FILL)
+
+    banner = _load_image(images.get(player.card)) if player.card else None
+    if banner is not None:
+        banner = ImageOps.fit(banner, size, Image.LANCZOS)
+        # opacity: 0.7
+        banner.putalpha(banner.getchannel("A").point(lambda value: int(value * 0.7)))
+        card.alpha_composite(banner)
+    card.alpha_composite(_podium_gradient(size))
+    card = _rounded(card, 24)
+    ImageDraw.Draw(card).rounded_rectangle(
+        (0, 0, size[0] - 1, size[1] - 1), 24, outline=(255, 255, 255, 26), width=1
+    )
+
+    draw = ImageDraw.Draw(card)
+    center = size[0] // 2
+    # Content is stacked from the bottom of the card (padding: 24px)
+    y = size[1] - 24
+    score_font, name_font = _text_font(18), _text_font(32)
+    draw.text((center, y), f"{player.rank} ({player.rr} RR)", font=score_font, fill=WHITE, anchor="md")
+    y -= 18 + 10
+    name = _fit_text(draw, player.name, name_font, size[0] - 48)
+    draw.text((center, y), name, font=name_font, fill=WHITE, anchor="md")
+    y -= 32 + 6
+    _draw_rank(draw, (center, y), player.rank_leaderboard, 24, GREY, "md")
+    y -= 24 + 16
+
+    avatar = _load_image(images.get(player.avatar)) if player.avatar else None
+    if avatar is not None:
+        avatar = _rounded(ImageOps.fit(avatar, (80, 80), Image.LANCZOS), 16)
+        card.alpha_composite(avatar, (center - 40, y - 80))
+
+    if player.rank_leaderboard == 1:
+        # The crown badge at the top of the first card
+        draw.rounded_rectangle((center - 24, 16, center + 24, 56), 20, fill=WHITE)
+        draw.polygon(
+            [(center - 14, 46), (center - 14, 28), (center - 7, 37), (center, 24),
+             (center + 7, 37), (center + 14, 28), (center + 14, 46)],
+            fill=(0, 0, 0),
+        )
+
+    canvas.alpha_composite(card, (left, top))
+
+
+def _draw_list_card(
+    canvas: Image.Image, box: tuple[int, int, int, int], player: LeaderboardPlayer, images: dict[str, Path]
+) -> None:
+    left, top, right, bottom = box
+    overlay = Image.new("RGBA", (right - left, bottom - top), (0, 0, 0, 0))
+    ImageDraw.Draw(overlay).rounded_rectangle(
+        (0, 0, overlay.width - 1, overlay.height - 1), 18, fill=CARD_FILL, outline=(255, 255, 255, 13), width=1
+    )
+    canvas.alpha_composite(overlay, (left, top))
+
+    draw = ImageDraw.Draw(canvas)
+    middle = (top + bottom) // 2
+    x = left + 24
+    _draw_rank(draw, (x, middle), player.rank_leaderboard, 16, DARK_GREY, "lm")
+    x += 30 + 16
+
+    avatar = _load_image(images.get(player.avatar)) if player.avatar else None
+    if avatar is not None:
+        avatar = _rounded(ImageOps.fit(avatar, (40, 40), Image.LANCZOS), 12)
+        canvas.alpha_composite(avatar, (x, middle - 20))
+    x += 40 + 16
+
+    score_font, name_font = _text_font(16), _text_font(18)
+    score = f"{player.rank} ({player.rr} RR)"
+    draw.text((right - 24, middle), score, font=score_font, fill=WHITE, anchor="rm")
+    max_name_width = right - 24 - draw.textlength(score, font=score_font) - 16 - x
+    draw.text((x, middle), _fit_text(draw, player.name, name_font, int(max_name_width)), font=name_font, fill=WHITE, anchor="lm")
+
+
+def render_leaderboard_image(
+    players: list[LeaderboardPlayer],
+    act: str,
+    images: dict[str, Path],
+    max_list_players: int | None = MAX_LIST_PLAYERS,
+) -> bytes:
+    """
+    Draw the podium and the list of templates/leaderboard.html and return a PNG.
+
+    :param players: Players sorted by rank
+    :param act: Act label of the leaderboard
+    :param images: Local copies of the card and avatar URLs, missing ones are left blank
+    :param max_list_players: Number of players listed under the podium (None = everyone)
+    """
+    for i, player in enumerate(players):
+        player.rank_leaderboard = i + 1
+    podium_players = players[:3]
+    rest_players = players[3:] if max_list_players is None else players[3:3 + max_list_players]
+
+    list_rows = (len(rest_players) + 1) // 2
+    list_height = list_rows * LIST_CARD_HEIGHT + max(0, list_rows - 1) * LIST_GAP
+    header_height = 48 + 12 + 18
+    content_height = header_height + 60 + PODIUM_HEIGHTS[1] + (60 + list_height if rest_players else 0)
+    height = max(MIN_HEIGHT, content_height + 2 * PADDING)
+
+    canvas = Image.new("RGBA", (WIDTH, height), BACKGROUND + (255,))
+    draw = ImageDraw.Draw(canvas)
+    canvas.alpha_composite(_logo(), (20, 20))
+
+    # The content is vertically centered like the flex body of the template
+    y = (height - content_height) // 2
+    draw.text((WIDTH // 2, y), "UNRANKED LEADERBOARD", font=_valorant_font(48), fill=WHITE, anchor="mt")
+    y += 48 + 12
+    subtitle = f"Top performing members · {act}" if act else "Top performing members"
+    draw.text((WIDTH // 2, y), subtitle, font=_text_font(18), fill=GREY, anchor="mt")
+    y += 18 + 60
+
+    column_width = (WIDTH - 2 * PADDING - 2 * PODIUM_GAP) // 3
+    podium_bottom = y + PODIUM_HEIGHTS[1]
+    # Columns are ordered second, first, third
+    for column, rank in enumerate((2, 1, 3)):
+        if rank > len(podium_players):
+            continue
+        left = PADDING + column * (column_width + PODIUM_GAP)
+        box = (left, podium_bottom - PODIUM_HEIGHTS[rank], left + column_width, podium_bottom)
+        _draw_podium_card(canvas, box, podium_players[rank - 1], images)
+    y = podium_bottom + 60
+
+    list_column_width = (WIDTH - 2 * PADDING - LIST_GAP) // 2
+    for i, player in enumerate(rest_players):
+        row, column = divmod(i, 2)
+        left = PADDING + column * (list_column_width + LIST_GAP)
+        top = y + row * (LIST_CARD_HEIGHT + LIST_GAP)
+        _draw_list_card(canvas, (left, top, left + list_column_width, top + LIST_CARD_HEIGHT), player, images)
+
+    buffer = BytesIO()
+    canvas.convert("RGB").save(buffer, format="PNG")
+    return buffer.getvalue()
@@ -0,0 +1,178 @@
+"""
+Proactive per-host rate limiting shared by the outbound API clients
+"""
+
+import asyncio
+import hashlib
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+# Used for hosts that were never configured
+DEFAULT_LIMIT = (10, 1.0)  # 10 requests per second
+
+
+def parse_rate_limit(value: str) -> tuple[int, float]:
+    """
+    Parse a rate limit written as "<requests>/<seconds>", e.g. "30/60".
+    """
+    requests_count, _, period = value.partition("/")
+    return int(requests_count), float(period or 1)
+
+
+class TokenBucket:
+    """
+    Reservation based token bucket.
+
+    Every caller takes a token immediately and is told how long to wait before
+    using it, so callers are served strictly in arrival order.
+    """
+
+    def __init__(self, requests_count: int, period: float):
+        self.capacity = float(requests_count)
+        self.rate = requests_count / period  # tokens per second
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        # `_updated_at` is in the future while the bucket is blocked
+        if now > self._updated_at:
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated_at) * self.rate
+            )
+            self._updated_at = now
+
+    def reserve(self) -> float:
+        """Take a token and return the number of seconds to wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            wait = max(0.0, self._updated_at - now)
+            if self._tokens < 0:
+                wait += -self._tokens / self.rate
+            return wait
+
+    def block(self, seconds: float) -> None:
+        """Hand out no token for the next `seconds` (Retry-After, exhausted quota...)"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            until = now + seconds
+            if until > self._updated_at:
+                self._updated_at = until
+                self._tokens = min(self._tokens, 0.0)
+
+    def limit_remaining(self, remaining: int) -> None:
+        """Never hand out more tokens than the server says are left"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, float(remaining))
+
+
+class RateLimiter:
+    """
+    Registry of token buckets, one per (host, API key).
+
+    Limits are configured per host and can be overridden for a given API key.
+    """
+
+    def __init__(self):
+        self._limits: dict[tuple[str, str | None], tuple[int, float]] = {}
+        self._buckets: dict[tuple[str, str | None], TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key_id(api_key: str | None) -> str | None:
+        # Keys are only used as identifiers, never kept in clear
+        if not api_key:
+            return None
+        return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+    def configure(
+        self, host: str, requests_count: int, period: float, api_key: str | None = None
+    ) -> None:
+        """Set the limit for a host, or for one API key on that host"""
+        key = (host, self._key_id(api_key))
+        with self._lock:
+            self._limits[key] = (requests_count, period)
+            self._buckets.pop(key, None)
+
+    def bucket(self, url: str, api_key: str | None = None) -> TokenBucket:
+        """Return the bucket used for requests to `url` made with `api_key`"""
+        host = urlsplit(url).hostname or url
+        key = (host, self._key_id(api_key))
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                limit = self._limits.get(key) or self._limits.get((host, None), DEFAULT_LIMIT)
+                bucket = self._buckets[key] = TokenBucket(*limit)
+            return bucket
+
+    async def acquire(self, url: str, api_key: str | None = None) -> None:
+        """Wait for a token without blocking the event loop"""
+        wait = self.bucket(url, api_key).reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def acquire_blocking(self, url: str, api_key: str | None = None) -> None:
+        """Wait for a token from synchronous code"""
+        wait = self.bucket(url, api_key).reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def block(self, url: str, seconds: float, api_key: str | None = None) -> None:
+        """Pause every request to the host of `url` for `seconds`"""
+        self.bucket(url, api_key).block(seconds)
+
+    def update_from_headers(
+        self, url: str, headers, api_key: str | None = None
+    ) -> float | None:
+        """
+        Adjust the bucket from `Retry-After` and `X-RateLimit-*` response headers.
+
+        :return: The Retry-After delay in seconds when the server sent one
+        """
+        bucket = self.bucket(url, api_key)
+
+        retry_after = _parse_retry_after(headers.get("Retry-After"))
+        if retry_after is not None:
+            bucket.block(retry_after)
+
+        remaining = _parse_number(headers.get("X-RateLimit-Remaining"))
+        if remaining is not None:
+            bucket.limit_remaining(int(remaining))
+            reset = _parse_number(headers.get("X-RateLimit-Reset"))
+            if remaining <= 0 and reset is not None:
+                # Either a delay in seconds or an epoch timestamp
+                bucket.block(reset - time.time() if reset > 1e9 else reset)
+
+        return retry_after
+
+
+def _parse_number(value: str | None) -> float | None:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _parse_retry_after(value: str | None) -> float | None:
+    """Retry-After is either a number of seconds or an HTTP date"""
+    if value is None:
+        return None
+    seconds = _parse_number(value)
+    if seconds is not None:
+        return max(0.0, seconds)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# Shared by every API client of the bot
+rate_limiter = RateLimiter()
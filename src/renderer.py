@@ -1,11 +1,191 @@
-from jinja2 import Environment, FileSystemLoader
+import asyncio
+import hashlib
+import json
+import os
+from contextlib import asynccontextmanager, suppress
+from functools import lru_cache
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template
 from pathlib import Path
-from playwright.async_api import async_playwright
+from typing import TYPE_CHECKING
+from urllib.parse import unquote, urlsplit
 from schemas import LeaderboardPlayer
+from src.assets import ASSETS_CACHE_DIR, fetch_font_stylesheet
+from src.cache import DiskCache
+from src.constants import DATA_DIR, DEVELOPMENT
+from src.display_helper import console, warning_style
+from src.executor import run_in_pool
+from src.image_cache import image_cache
+from src.metrics import outbound_timer
+from src.pillow_renderer import render_leaderboard_image
 
-def render_html(templates_path: Path, render_path: Path, players: list[LeaderboardPlayer], act: str):
-    env = Environment(loader=FileSystemLoader(templates_path))
-    template = env.get_template("leaderboard.html")
+if TYPE_CHECKING:
+    from playwright.async_api import Browser, Playwright, Route
+
+# "playwright" screenshots the HTML template in Chromium, "pillow" draws the same
+# layout directly and does not need a browser (Playwright is then not imported at all)
+LEADERBOARD_RENDERER = os.getenv("LEADERBOARD_RENDERER", "playwright").lower()
+RENDERERS = ("playwright", "pillow")
+
+# Number of renders allowed to run at the same time in the shared browser
+MAX_CONCURRENT_PAGES = 2
+
+# The rendered page is served from memory under this virtual origin, and its
+# relative resources are served from these directories of the project only
+RENDER_ORIGIN = "http://leaderboard.local"
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SERVED_PROJECT_DIRS = ("static", "assets", "templates")
+# Cached font stylesheets are served under this path, cached cards, avatars and fonts under the other one
+ASSETS_CACHE_URL_PATH = "/cache"
+IMAGES_CACHE_URL_PATH = "/images"
+
+# Compiled templates, reused across restarts
+TEMPLATES_BYTECODE_DIR = DATA_DIR / "jinja"
+
+# Number of players listed under the podium for each leaderboard variant (None = everyone)
+LEADERBOARD_VARIANTS: dict[str, int | None] = {"top12": 9, "full": None}
+DEFAULT_VARIANT = "top12"
+
+# Finished PNGs, keyed by a hash of everything that goes into the render
+RENDER_CACHE_MAX_BYTES = 50 * 1024 * 1024
+render_cache = DiskCache(DATA_DIR / "renders", max_bytes=RENDER_CACHE_MAX_BYTES, suffix=".png")
+
+
+class BrowserPool:
+    """
+    Long-lived Chromium instance shared by every render.
+    - Started lazily on first use and restarted if it crashed or disconnected
+    - Every render gets its own fresh browser context, closed afterwards
+    - At most `max_pages` renders run at the same time
+    """
+
+    def __init__(self, max_pages: int = MAX_CONCURRENT_PAGES):
+        self._semaphore = asyncio.Semaphore(max_pages)
+        self._lock = asyncio.Lock()
+        self._playwright: "Playwright | None" = None
+        self._browser: "Browser | None" = None
+
+    @property
+    def is_connected(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
+
+    async def _get_browser(self) -> "Browser":
+        from playwright.async_api import async_playwright
+
+        async with self._lock:
+            if not self.is_connected:
+                if self._browser is not None:
+                    console.print("Chromium is not connected anymore, restarting it", style=warning_style)
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch()
+            return self._browser
+
+    async def start(self) -> None:
+        """Launch the browser ahead of the first render"""
+        await self._get_browser()
+
+    @asynccontextmanager
+    async def page(self, size: tuple[int, int]):
+        """Yield a page in a fresh context of the shared browser"""
+        from playwright.async_api import Error as PlaywrightError
+
+        async with self._semaphore:
+            browser = await self._get_browser()
+            context = await browser.new_context(viewport={"width": size[0], "height": size[1]})
+            try:
+                page = await context.new_page()
+                yield page
+            finally:
+                # The context is already gone if the browser crashed during the render
+                with suppress(PlaywrightError):
+                    await context.close()
+
+    async def close(self) -> None:
+        """Close the browser and stop Playwright"""
+        if self._playwright is None:
+            # Never started, Playwright may not even be installed
+            return
+        from playwright.async_api import Error as PlaywrightError
+
+        async with self._lock:
+            if self._browser is not None:
+                with suppress(PlaywrightError):
+                    await self._browser.close()
+                self._browser = None
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
+
+
+browser_pool = BrowserPool()
+
+
+async def prepare_render_assets(
+    players: list[LeaderboardPlayer],
+) -> tuple[list[LeaderboardPlayer], str | None]:
+    """
+    Resolve every remote resource of the leaderboard ahead of the render.
+    - Fetch player cards and avatars from the shared image cache
+    - Cache the Inter font stylesheet and its font files
+    Returns copies of the players pointing to the local copies (None when an image is
+    unavailable) and the local font stylesheet URL, so the page never waits on the network.
+    """
+    remote_urls = [url for player in players for url in (player.card, player.avatar) if url]
+    local_paths, font_stylesheet = await asyncio.gather(
+        image_cache.get_paths(remote_urls), fetch_font_stylesheet(IMAGES_CACHE_URL_PATH)
+    )
+
+    def local_url(url: str | None) -> str | None:
+        path = local_paths.get(url) if url else None
+        return f"{IMAGES_CACHE_URL_PATH}/{path.name}" if path else None
+
+    render_players = [
+        player.model_copy(update={"card": local_url(player.card), "avatar": local_url(player.avatar)})
+        for player in players
+    ]
+    font_stylesheet_url = f"{ASSETS_CACHE_URL_PATH}/{font_stylesheet.name}" if font_stylesheet else None
+    return render_players, font_stylesheet_url
+
+
+@lru_cache(maxsize=8)
+def get_environment(templates_path: Path) -> Environment:
+    """
+    Jinja environment of a templates directory, built once per directory.
+    Templates are parsed once and kept in memory, their compiled bytecode is also
+    stored on disk. Template files are only checked for changes in development.
+    """
+    TEMPLATES_BYTECODE_DIR.mkdir(parents=True, exist_ok=True)
+    return Environment(
+        loader=FileSystemLoader(templates_path),
+        bytecode_cache=FileSystemBytecodeCache(TEMPLATES_BYTECODE_DIR),
+        auto_reload=DEVELOPMENT,
+    )
+
+
+def get_template(templates_path: Path, name: str = "leaderboard.html") -> Template:
+    return get_environment(templates_path.resolve()).get_template(name)
+
+
+def _check_variant(variant: str) -> None:
+    if variant not in LEADERBOARD_VARIANTS:
+        raise ValueError(f"Unknown leaderboard variant {variant!r}, expected one of {list(LEADERBOARD_VARIANTS)}")
+
+
+def _list_players(players: list[LeaderboardPlayer], variant: str) -> list[LeaderboardPlayer]:
+    """Players listed under the podium in a leaderboard variant"""
+    _check_variant(variant)
+    max_players = LEADERBOARD_VARIANTS[variant]
+    return players[3:] if max_players is None else players[3:3 + max_players]
+
+
+def render_html(
+    templates_path: Path,
+    players: list[LeaderboardPlayer],
+    act: str,
+    font_stylesheet: str | None = None,
+    variant: str = DEFAULT_VARIANT,
+) -> str:
+    template = get_template(templates_path)
 
     for i, player in enumerate(players):
         player.rank_leaderboard = i + 1
@@ -14,33 +194,164 @@ def render_html(templates_path: Path, render_path: Path, players: list[Leaderboa
     second_player = players[1] if len(players) > 1 else None
     third_player = players[2] if len(players) > 2 else None
 
-    rest_players = players[3:12] if len(players) > 3 else []
+    rest_players = _list_players(players, variant)
 
     html_content = template.render(
         act=act,
         first_player=first_player,
         second_player=second_player,
         third_player=third_player,
-        rest_players=rest_players
+        rest_players=rest_players,
+        font_stylesheet=font_stylesheet,
     )
-    rendered_file_path = render_path / "leaderboard_render.html"
+    return html_content
+
+
+def render_html_variants(
+    templates_path: Path,
+    players: list[LeaderboardPlayer],
+    act: str,
+    variants: tuple[str, ...] = tuple(LEADERBOARD_VARIANTS),
+    font_stylesheet: str | None = None,
+) -> dict[str, str]:
+    """Render several variants of the leaderboard from the same compiled template"""
+    return {
+        variant: render_html(templates_path, players, act, font_stylesheet, variant)
+        for variant in variants
+    }
+
+
+async def _serve_local_file(route: "Route") -> None:
+    """
+    Fulfill a request to the virtual origin with a cached asset or a file of one of
+    SERVED_PROJECT_DIRS. Anything else (.env, the caches, the sources...) is aborted.
+    """
+    request_path = unquote(urlsplit(route.request.url).path)
+    directory, _, relative_path = request_path.lstrip("/").partition("/")
+    if "/" + directory == ASSETS_CACHE_URL_PATH:
+        root = ASSETS_CACHE_DIR.resolve()
+    elif "/" + directory == IMAGES_CACHE_URL_PATH:
+        root = image_cache.originals.directory.resolve()
+    elif directory in SERVED_PROJECT_DIRS:
+        root = PROJECT_ROOT / directory
+    else:
+        await route.abort()
+        return
+
+    file_path = (root / relative_path).resolve()
+    if root in file_path.parents and file_path.is_file():
+        await route.fulfill(path=file_path)
+    else:
+        await route.abort()
+
+
+async def generate_image(html_content: str, size: tuple[int, int] = (1000, 1400)) -> bytes:
+    """
+    Load the rendered HTML straight into a page and return the screenshot as PNG bytes.
+    Nothing is written to disk, so concurrent renders cannot overwrite each other.
+    Every resource is served locally (see prepare_render_assets): requests to any other
+    origin are aborted, so the page is ready as soon as it is loaded.
+    """
+    from playwright.async_api import Error as PlaywrightError
+
+    # Same location as the template so its relative links keep working
+    page_url = f"{RENDER_ORIGIN}/templates/leaderboard.html"
+
+    async def handle_route(route: "Route") -> None:
+        url = route.request.url
+        if url == page_url:
+            await route.fulfill(body=html_content, content_type="text/html; charset=utf-8")
+        elif url.startswith(RENDER_ORIGIN + "/"):
+            await _serve_local_file(route)
+        else:
+            await route.abort()
+
+    for attempt in range(2):
+        try:
+            with outbound_timer("playwright", "screenshot"):
+                async with browser_pool.page(size) as page:
+                    await page.route("**/*", handle_route)
+                    await page.goto(page_url, wait_until="load")
+                    # Web fonts may still be decoding when the load event fires
+                    await page.evaluate("document.fonts.ready.then(() => true)")
+
+                    return await page.screenshot(full_page=True)
+        except PlaywrightError:
+            # Retry once on a restarted browser if this one crashed mid-render
+            if attempt == 1 or browser_pool.is_connected:
+                raise
+            console.print("Chromium crashed during the render, retrying", style=warning_style)
+
 
-    with open(rendered_file_path, "w", encoding="utf-8") as f:
-        f.write(html_content)
-    return rendered_file_path
+def render_cache_key(
+    templates_path: Path,
+    players: list[LeaderboardPlayer],
+    act: str,
+    renderer: str = LEADERBOARD_RENDERER,
+    variant: str = DEFAULT_VARIANT,
+) -> str:
+    """
+    Stable hash of every input of a leaderboard render: the renderer, the variant, the
+    players, the act label, the template and the stylesheet. Same inputs always give the same image.
+    """
+    digest = hashlib.sha256()
+    digest.update(renderer.encode())
+    digest.update(variant.encode())
+    players_data = [player.model_dump(exclude={"rank_leaderboard"}) for player in players]
+    digest.update(json.dumps(players_data, sort_keys=True).encode())
+    digest.update(act.encode())
+    digest.update((templates_path / "leaderboard.html").read_bytes())
+    digest.update((PROJECT_ROOT / "static" / "style.css").read_bytes())
+    return digest.hexdigest()
 
 
-async def generate_image(rendered_file_path: Path, size: tuple[int, int] = (1000, 1400)) -> Path:
-    screenshot_path = rendered_file_path.parent / "leaderboard.png"
-    async with async_playwright() as p:
-        browser = await p.chromium.launch()
-        page = await browser.new_page(viewport={"width": size[0], "height": size[1]})
+async def render_leaderboard(
+    templates_path: Path,
+    players: list[LeaderboardPlayer],
+    act: str,
+    renderer: str = LEADERBOARD_RENDERER,
+    variant: str = DEFAULT_VARIANT,
+) -> bytes:
+    """
+    Return the leaderboard PNG, reusing a previous render when nothing changed.
+    - Hash the render inputs and look the result up in the render cache
+    - Otherwise resolve the assets and render them with the chosen backend:
+      a Chromium screenshot of the HTML template or a direct Pillow drawing
+    - A render missing an image or the web font (e.g. while offline) is returned but
+      not cached, so the full render replaces it as soon as the assets are back
+    """
+    if renderer not in RENDERERS:
+        raise ValueError(f"Unknown leaderboard renderer {renderer!r}, expected one of {RENDERERS}")
+    # Checked here for both backends, the Pillow one would only fail inside the worker
+    _check_variant(variant)
 
-        await page.goto(rendered_file_path.absolute().as_uri())
+    cache_key = render_cache_key(templates_path, players, act, renderer, variant)
+    image = render_cache.get(cache_key)
+    if image is not None:
+        console.print(f"Leaderboard render cache hit ({cache_key[:12]})")
+        return image
 
-        await page.wait_for_load_state("networkidle")
+    remote_urls = {url for player in players for url in (player.card, player.avatar) if url}
+    if renderer == "pillow":
+        images = await image_cache.get_paths(list(remote_urls))
+        complete = len(images) == len(remote_urls)
+        # CPU bound, kept off the event loop
+        image = await run_in_pool(
+            render_leaderboard_image, players, act, images, LEADERBOARD_VARIANTS[variant]
+        )
+    else:
+        render_players, font_stylesheet = await prepare_render_assets(players)
+        resolved = sum(
+            (player.card is not None) + (player.avatar is not None) for player in render_players
+        )
+        complete = font_stylesheet is not None and resolved == sum(
+            bool(player.card) + bool(player.avatar) for player in players
+        )
+        html_content = render_html(templates_path, render_players, act, font_stylesheet, variant)
+        image = await generate_image(html_content)
 
-        await page.screenshot(path=screenshot_path, full_page=True)
-        await browser.close()
-    
-    return screenshot_path
+    if complete:
+        render_cache.set(cache_key, image)
+    else:
+        console.print("Some leaderboard assets are unavailable, the render is not cached", style=warning_style)
+    return image
@@ -1,30 +1,81 @@
-import requests
+import aiohttp
+import asyncio
 import os
 import dotenv
 import time
 
+from src.cache import PersistentCache, TTLCache
+from src.constants import DATA_DIR
+from src.display_helper import console, warning_style
+from src.http_client import get_session
+from src.metrics import outbound_timer
+from src.rate_limiter import parse_rate_limit, rate_limiter
+
 dotenv.load_dotenv()
 
+# HenrikDev limits are per API key, basic keys allow 30 requests per minute
+rate_limiter.configure(
+    "api.henrikdev.xyz",
+    *parse_rate_limit(os.getenv("RIOT_API_RATE_LIMIT", "30/60")),
+    api_key=os.getenv("RIOT_API_KEY"),
+)
+
+REQUEST_TIMEOUT = 10  # seconds
+RETRY_DELAY = 60  # seconds, multiplied by the attempt number
+# The bot's client retries sooner: a command or a leaderboard refresh cannot wait minutes
+ASYNC_RETRY_DELAY = 5  # seconds, multiplied by the attempt number
+RETRY_ATTEMPTS = 3
+
+# Time to live of each cached endpoint in seconds, None keeps the entry forever
+ENDPOINT_CACHE_TTL = {
+    "player_info": 3 * 24 * 3600,  # account name and card almost never change
+    "rank_carrier": 5 * 60,  # rank and RR only change after a match
+    "mmr_history": 5 * 60,
+    "stored_mmr_history": 5 * 60,
+    "match_list": 5 * 60,
+    "stored_matches": 5 * 60,
+    "match_details": None,  # a finished match never changes
+}
+
+def _endpoint_name(url: str) -> str:
+    """Version and endpoint of a HenrikDev URL without the player (v3/mmr, v1/account...)"""
+    return "/".join(url.removeprefix(RiotAPIClient.BASE_URL).split("/")[2:4])
+
+
 class RiotAPIClient:
     BASE_URL = "https://api.henrikdev.xyz"
 
     def __init__(self):
-        self.headers = {"Authorization": os.getenv("RIOT_API_KEY")}
+        self.api_key = os.getenv("RIOT_API_KEY")
+        self.headers = {"Authorization": self.api_key}
+        # Only this legacy synchronous client needs requests, imported on first use
+        import requests
+
         self.session = requests.Session()
     
     def _retry_request(self, url: str, retry: int = 3) -> dict:
+        import requests
+
         for attempt in range(retry):
+            # Wait for our turn in the shared bucket instead of waiting for a 429
+            rate_limiter.acquire_blocking(url, self.api_key)
             try:
-                response = self.session.get(url, headers=self.headers)
-                response.raise_for_status()
-                return response.json()
+                with outbound_timer("riot", _endpoint_name(url)):
+                    response = self.session.get(url, headers=self.headers, timeout=REQUEST_TIMEOUT)
+                    retry_after = rate_limiter.update_from_headers(url, response.headers, self.api_key)
+                    response.raise_for_status()
+                    return response.json()
             except requests.exceptions.RequestException as e:
                 print(f"Attempt {attempt + 1} failed: {e}")
                 if attempt == retry - 1:
                     raise
+                elif e.response is not None and e.response.status_code == 429:
+                    # The next acquire waits for Retry-After, or for the fixed delay without it
+                    if retry_after is None:
+                        rate_limiter.block(url, (attempt + 1) * RETRY_DELAY, self.api_key)
                 else:
                     # 1 minute, 2 minutes, 3 minutes...
-                    time.sleep((attempt + 1) * 60)
+                    time.sleep((attempt + 1) * RETRY_DELAY)
     
     def get_match_list(self, player_name: str, region: str, tag: str) -> dict:
         url = f"{self.BASE_URL}/valorant/v3/matches/{region}/{player_name}/{tag}"
@@ -59,4 +110,172 @@ class RiotAPIClient:
     def get_stored_mmr_history(self, player_name: str, region: str, tag: str, platform: str) -> dict:
         url = f"{self.BASE_URL}/valorant/v2/stored-mmr-history/{region}/{platform}/{player_name}/{tag}"
         response = self._retry_request(url)
-        return response
\ No newline at end of file
+        return response
+
+
+class AsyncRiotAPIClient:
+    """
+    Non-blocking version of RiotAPIClient, to be used from the bot's coroutines.
+    Requests go through the shared aiohttp session and every wait is an asyncio.sleep().
+    """
+    BASE_URL = RiotAPIClient.BASE_URL
+
+    def __init__(
+        self,
+        timeout: float = REQUEST_TIMEOUT,
+        retry: int = RETRY_ATTEMPTS,
+        retry_delay: float = ASYNC_RETRY_DELAY,
+    ):
+        self.api_key = os.getenv("RIOT_API_KEY")
+        # aiohttp refuses None header values
+        self.headers = {"Authorization": self.api_key} if self.api_key else {}
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.retry = retry
+        self.retry_delay = retry_delay
+
+    @property
+    def max_request_duration(self) -> float:
+        """Longest time a request can take with all its retries, rate limiter waits excluded"""
+        backoff = sum((attempt + 1) * self.retry_delay for attempt in range(self.retry - 1))
+        return self.retry * self.timeout.total + backoff
+
+    async def _retry_request(self, url: str, retry: int | None = None) -> dict:
+        retry = retry or self.retry
+        session = get_session()
+        for attempt in range(retry):
+            await rate_limiter.acquire(url, self.api_key)
+            retry_after = None
+            try:
+                with outbound_timer("riot", _endpoint_name(url)):
+                    async with session.get(url, headers=self.headers, timeout=self.timeout) as response:
+                        retry_after = rate_limiter.update_from_headers(url, response.headers, self.api_key)
+                        response.raise_for_status()
+                        return await response.json(content_type=None)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                console.print(f"Attempt {attempt + 1} failed: {type(e).__name__} {e}", style=warning_style)
+                if attempt == retry - 1:
+                    raise
+                elif isinstance(e, aiohttp.ClientResponseError) and e.status == 429:
+                    # The next acquire waits for Retry-After, or for the fixed delay without it
+                    if retry_after is None:
+                        rate_limiter.block(url, (attempt + 1) * self.retry_delay, self.api_key)
+                else:
+                    # Linear backoff without blocking the event loop
+                    await asyncio.sleep((attempt + 1) * self.retry_delay)
+
+    async def get_match_list(self, player_name: str, region: str, tag: str) -> dict:
+        url = f"{self.BASE_URL}/valorant/v3/matches/{region}/{player_name}/{tag}"
+        return await self._retry_request(url)
+
+    async def get_player_info(self, player_name: str, tag: str) -> dict:
+        url = f"{self.BASE_URL}/valorant/v1/account/{player_name}/{tag}"
+        response = await self._retry_request(url)
+        return response.get("data", {})
+
+    async def get_mmr_history(self, player_name: str, region: str, tag: str, platform: str) -> dict:
+        url = f"{self.BASE_URL}/valorant/v2/mmr-history/{region}/{platform}/{player_name}/{tag}"
+        return await self._retry_request(url)
+
+    async def get_rank_carrier(self, player_name: str, region: str, tag: str, platform: str) -> dict:
+        url = f"{self.BASE_URL}/valorant/v3/mmr/{region}/{platform}/{player_name}/{tag}"
+        return await self._retry_request(url)
+
+    async def get_match_details(self, region: str, match_id: str) -> dict:
+        url = f"{self.BASE_URL}/valorant/v4/match/{region}/{match_id}"
+        return await self._retry_request(url)
+
+    async def get_stored_matches(self, player_name: str, region: str, tag: str) -> dict:
+        url = f"{self.BASE_URL}/valorant/v1/stored-matches/{region}/{player_name}/{tag}"
+        return await self._retry_request(url)
+
+    async def get_stored_mmr_history(self, player_name: str, region: str, tag: str, platform: str) -> dict:
+        url = f"{self.BASE_URL}/valorant/v2/stored-mmr-history/{region}/{platform}/{player_name}/{tag}"
+        return await self._retry_request(url)
+
+
+def _is_cacheable(response) -> bool:
+    """
+    True for a successful payload with data. Error payloads and empty answers, which
+    the API also returns while degraded, are never cached: they would hide the player
+    for the whole TTL of the endpoint (days for player_info).
+    """
+    if not isinstance(response, dict) or not response or response.get("errors"):
+        return False
+    if response.get("status", 200) != 200:
+        return False
+    return bool(response.get("data", response))
+
+
+class CachedRiotAPIClient:
+    """
+    Caching layer in front of AsyncRiotAPIClient with a TTL per endpoint (see ENDPOINT_CACHE_TTL).
+    Every method accepts `force_refresh=True` to skip the cached value and store a fresh one.
+    """
+
+    def __init__(
+        self,
+        client: AsyncRiotAPIClient | None = None,
+        max_entries: int = 512,
+        persist: bool = True,
+    ):
+        self.client = client or AsyncRiotAPIClient()
+        backend = PersistentCache(DATA_DIR / "riot_cache.sqlite3") if persist else None
+        self.cache = TTLCache(max_entries, backend=backend, namespace="riot")
+
+    async def _cached(self, endpoint: str, key_parts: tuple, fetch, force_refresh: bool) -> dict:
+        # Riot ids are case insensitive
+        cache_key = f"{endpoint}:" + "/".join(str(part).casefold() for part in key_parts)
+        if not force_refresh:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        response = await fetch()
+        if _is_cacheable(response):
+            self.cache.set(cache_key, response, ENDPOINT_CACHE_TTL[endpoint])
+        else:
+            console.print(f"Not caching the empty or failed Riot response of {cache_key}", style=warning_style)
+        return response
+
+    async def get_match_list(self, player_name: str, region: str, tag: str, force_refresh: bool = False) -> dict:
+        return await self._cached(
+            "match_list", (region, player_name, tag),
+            lambda: self.client.get_match_list(player_name, region, tag), force_refresh,
+        )
+
+    async def get_player_info(self, player_name: str, tag: str, force_refresh: bool = False) -> dict:
+        return await self._cached(
+            "player_info", (player_name, tag),
+            lambda: self.client.get_player_info(player_name, tag), force_refresh,
+        )
+
+    async def get_mmr_history(self, player_name: str, region: str, tag: str, platform: str, force_refresh: bool = False) -> dict:
+        return await self._cached(
+            "mmr_history", (region, platform, player_name, tag),
+            lambda: self.client.get_mmr_history(player_name, region, tag, platform), force_refresh,
+        )
+
+    async def get_rank_carrier(self, player_name: str, region: str, tag: str, platform: str, force_refresh: bool = False) -> dict:
+        return await self._cached(
+            "rank_carrier", (region, platform, player_name, tag),
+            lambda: self.client.get_rank_carrier(player_name, region, tag, platform), force_refresh,
+        )
+
+    async def get_match_details(self, region: str, match_id: str, force_refresh: bool = False) -> dict:
+        # Match ids are unique across regions
+        return await self._cached(
+            "match_details", (match_id,),
+            lambda: self.client.get_match_details(region, match_id), force_refresh,
+        )
+
+    async def get_stored_matches(self, player_name: str, region: str, tag: str, force_refresh: bool = False) -> dict:
+        return await self._cached(
+            "stored_matches", (region, player_name, tag),
+            lambda: self.client.get_stored_matches(player_name, region, tag), force_refresh,
+        )
+
+    async def get_stored_mmr_history(self, player_name: str, region: str, tag: str, platform: str, force_refresh: bool = False) -> dict:
+        return await self._cached(
+            "stored_mmr_history", (region, platform, player_name, tag),
+            lambda: self.client.get_stored_mmr_history(player_name, region, tag, platform), force_refresh,
+        )
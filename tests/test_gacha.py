@@ -0,0 +1,26 @@
+import unittest
+from io import BytesIO
+
+from PIL import Image
+
+from src.gacha import FADE_FRAMES, load_gacha_assets, render_pull_gif
+
+
+class RenderPullGifTest(unittest.TestCase):
+    def test_animation_plays_once(self):
+        gif = render_pull_gif("Player", None)
+
+        # The NETSCAPE2.0 application extension is what makes a GIF loop
+        self.assertNotIn(b"NETSCAPE2.0", gif)
+        with Image.open(BytesIO(gif)) as image:
+            self.assertNotIn("loop", image.info)
+
+    def test_fade_frames_are_appended(self):
+        gif = render_pull_gif("Player", None)
+
+        with Image.open(BytesIO(gif)) as image:
+            self.assertEqual(image.n_frames, len(load_gacha_assets().frames) + FADE_FRAMES)
+
+
+if __name__ == "__main__":
+    unittest.main()